@@ -13,4 +13,11 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'connectly_project.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# The newsfeed event stream is mounted here, outside Django's request handler.
+from posts.asgi import with_stream_routes
+application = with_stream_routes(django_application)
+
+from connectly_project import startup
+startup.initialize()
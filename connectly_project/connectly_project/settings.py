@@ -52,6 +52,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
+    'posts.middleware.HashingBusyMiddleware',
 ]
 
 ROOT_URLCONF = 'connectly_project.urls'
@@ -101,11 +102,21 @@ SECURE_HSTS_INCLUDE_SUBDOMAINS = True
 SECURE_HSTS_PRELOAD = True
 
 PASSWORD_HASHERS = [
-    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'posts.hashing.TunableArgon2PasswordHasher',
     'django.contrib.auth.hashers.PBKDF2PasswordHasher',
     'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
 ]
 
+# Argon2 cost; changing these rehashes passwords on next login
+ARGON2_TIME_COST = 2
+ARGON2_MEMORY_COST = 102400
+ARGON2_PARALLELISM = 8
+
+# Password hashing worker pool (0 workers hashes on the request thread)
+PASSWORD_HASH_WORKERS = 2
+PASSWORD_HASH_QUEUE_LIMIT = 32
+PASSWORD_HASH_ADMISSION_TIMEOUT = 0.5
+
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -183,4 +194,52 @@ CACHES = {
 }
 
 # Cache timeout (in seconds)
-CACHE_TTL = 60 * 15  # 15 minutes
\ No newline at end of file
+CACHE_TTL = 60 * 15  # 15 minutes
+
+# Like write-behind buffer (flushed by `manage.py flush_likes`)
+LIKE_WRITE_BEHIND = False
+LIKE_FLUSH_BATCH_SIZE = 500
+LIKE_MIRROR_TTL = 60 * 60 * 24  # Redis copy of each post's likers and count
+
+# Transactional outbox (drained by `manage.py run_outbox`)
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_LEASE_SECONDS = 30
+
+# Rows deleted per chunk when purging soft-deleted posts
+POST_PURGE_CHUNK_SIZE = 1000
+
+# Cross-request permission cache (versioned, see posts.permission_cache)
+PERMISSION_CACHE_TTL = 60 * 15
+
+# Live newsfeed events ('memory' for a single ASGI worker, 'redis' to fan out across workers)
+EVENT_BROKER = 'memory'
+EVENT_CHANNEL = 'connectly:events'
+EVENT_QUEUE_SIZE = 100
+SSE_KEEPALIVE_SECONDS = 15
+SSE_TICKET_MAX_AGE = 60  # seconds a newsfeed/stream/ticket/ ticket stays valid
+EVENT_RECONNECT_MAX_SECONDS = 30
+
+# Runtime-tunable values served by singletons.config_manager.ConfigManager.
+# Override them without a restart with `manage.py config set KEY VALUE`.
+CONFIG_DEFAULTS = {
+    'DEFAULT_PAGE_SIZE': 10,
+    'CACHE_TTL': CACHE_TTL,
+    'LIKE_WRITE_BEHIND': LIKE_WRITE_BEHIND,
+    'POST_FRAGMENT_CACHE': True,
+}
+# Inclusive (min, max) for integer values; `config set` rejects anything outside.
+MAX_PAGE_SIZE = 100
+CONFIG_BOUNDS = {
+    'DEFAULT_PAGE_SIZE': (1, MAX_PAGE_SIZE),
+    'CACHE_TTL': (1, 60 * 60 * 24),
+}
+CONFIG_POLL_INTERVAL = 5  # seconds between shared-store version checks
+
+# Import the URLconf and views when wsgi.py/asgi.py load (see connectly_project.startup)
+PRELOAD_APP = False
+
+# Hot/cold archival (run `manage.py archive_posts`)
+ARCHIVE_AFTER_DAYS = 365
+ARCHIVE_BATCH_SIZE = 100
+ARCHIVE_MAX_ROWS = 10000  # comments + likes moved per transaction; bigger posts are archived alone
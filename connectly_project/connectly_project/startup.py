@@ -0,0 +1,43 @@
+"""
+App initialization for wsgi.py / asgi.py.
+
+With a pre-forking server, load the app once in the master and reset
+per-process state in each worker, e.g. for gunicorn:
+
+    preload_app = True  # together with PRELOAD_APP = True in settings
+
+    def post_fork(server, worker):
+        from connectly_project.startup import post_fork
+        post_fork()
+"""
+
+
+def preload():
+    """Imports the URLconf, views and password hashers up front."""
+    from django.contrib.auth.hashers import get_hashers
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+    get_hashers()
+
+
+def initialize():
+    """Starts per-process background work; called when the app module is loaded."""
+    from django.conf import settings
+    from singletons.config_manager import ConfigManager
+    from singletons.logger_singleton import LoggerSingleton
+    if getattr(settings, 'PRELOAD_APP', False):
+        preload()
+    ConfigManager().start_polling()
+    LoggerSingleton().get_logger().info("API initialized successfully.")
+
+
+def post_fork():
+    """Drops state inherited from the master that must not be shared across processes."""
+    from django.core.cache import caches
+    from django.db import connections
+    from posts.hashing import reset_pool
+    connections.close_all()
+    for cache in caches.all(initialized_only=True):
+        cache.close()
+    reset_pool()
+    initialize()
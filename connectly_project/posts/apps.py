@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class PostsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'posts'
+
+    def ready(self):
+        # Register outbox handlers defined outside posts.outbox.
+        from . import purge  # noqa: F401
+        from .signals import connect_signals
+        connect_signals()
@@ -0,0 +1,173 @@
+import json
+import zlib
+from collections import Counter, defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from .models import Post, Comment, Like, ArchivedPost
+from .outbox import enqueue, enqueue_cache_invalidation
+from .like_buffer import flush_likes, forget_post
+from .purge import purge_post, POST_PURGE, PURGE_CHUNK_SIZE
+from singletons.logger_singleton import LoggerSingleton
+
+logger = LoggerSingleton().get_logger()
+
+ARCHIVE_AFTER_DAYS = getattr(settings, 'ARCHIVE_AFTER_DAYS', 365)
+ARCHIVE_BATCH_SIZE = getattr(settings, 'ARCHIVE_BATCH_SIZE', 100)
+ARCHIVE_MAX_ROWS = getattr(settings, 'ARCHIVE_MAX_ROWS', 10000)
+
+COMMENT_FIELDS = ('id', 'author_id', 'text', 'created_at')
+LIKE_FIELDS = ('user_id', 'created_at')
+
+
+def archive_cutoff(days=ARCHIVE_AFTER_DAYS):
+    return timezone.now() - timedelta(days=days)
+
+
+def _engagement_rows(ids):
+    rows = Counter()
+    for model in (Comment, Like):
+        for row in model.objects.filter(post_id__in=ids).values('post_id').annotate(total=Count('id')):
+            rows[row['post_id']] += row['total']
+    return rows
+
+
+def _pack_engagement_in_chunks(post_id, chunk_size):
+    """
+    Same blob as ArchivedPost.pack_engagement, built by streaming the rows
+    through the compressor so only one chunk is in memory at a time.
+    Returns (comments_count, likes_count, engagement).
+    """
+    compressor = zlib.compressobj()
+    parts = []
+    counts = []
+    for prefix, model, fields in (('{"comments": [', Comment, COMMENT_FIELDS), ('], "likes": [', Like, LIKE_FIELDS)):
+        parts.append(compressor.compress(prefix.encode()))
+        count = 0
+        rows = model.objects.filter(post_id=post_id).order_by('id').values(*fields).iterator(chunk_size=chunk_size)
+        for row in rows:
+            parts.append(compressor.compress((', ' if count else '').encode() + json.dumps(row, default=str).encode()))
+            count += 1
+        counts.append(count)
+    parts.append(compressor.compress(b']}'))
+    parts.append(compressor.flush())
+    return counts[0], counts[1], b''.join(parts)
+
+
+def _forget_likes(post_id):
+    dropped = forget_post(post_id)
+    if dropped:
+        # Buffered between the flush above and the archive commit.
+        logger.warning(f"Dropped {dropped} buffered likes of archived post {post_id}.")
+
+
+def archive_large_post(post_id, chunk_size=PURGE_CHUNK_SIZE):
+    """
+    Archives one post with more engagement than fits in a batch. The
+    transaction only writes the ArchivedPost row and soft-deletes the post;
+    its likes and comments are then removed in chunks like a purge.
+    Returns the number of posts archived (0 or 1).
+    """
+    flush_likes(post_ids=[post_id])
+    with transaction.atomic():
+        # The lock keeps new likes and comments off this post while it is read.
+        post = Post.objects.select_for_update().filter(id=post_id).first()
+        if post is None:
+            return 0
+        comments_count, likes_count, engagement = _pack_engagement_in_chunks(post.id, chunk_size)
+        ArchivedPost.objects.create(
+            id=post.id,
+            title=post.title,
+            content=post.content,
+            author_id=post.author_id,
+            created_at=post.created_at,
+            privacy=post.privacy,
+            likes_count=likes_count,
+            comments_count=comments_count,
+            engagement=engagement,
+        )
+        post.deleted_at = timezone.now()
+        post.save(update_fields=['deleted_at'])
+        enqueue_cache_invalidation(keys=[f'post_{post.id}'], patterns=['posts_*', 'newsfeed_*'])
+        # Finishes the hot-side delete if this process stops before purge_post does.
+        enqueue(POST_PURGE, {'post_id': post.id})
+    purge_post(post.id, chunk_size=chunk_size)
+    return 1
+
+
+def archive_batch(cutoff, batch_size=ARCHIVE_BATCH_SIZE, max_rows=ARCHIVE_MAX_ROWS):
+    """
+    Moves up to batch_size posts created before cutoff, with their comments
+    and likes, into ArchivedPost in one transaction. A batch stops before
+    max_rows comments and likes; a post with more than that on its own
+    goes through archive_large_post.
+    Returns the number of posts archived.
+    """
+    candidates = list(
+        Post.objects.filter(created_at__lt=cutoff)
+        .order_by('created_at')
+        .values_list('id', flat=True)[:batch_size]
+    )
+    if not candidates:
+        return 0
+
+    # Buffered write-behind likes must reach the Like table to be archived.
+    flush_likes(post_ids=candidates)
+    engagement_rows = _engagement_rows(candidates)
+    if engagement_rows[candidates[0]] > max_rows:
+        return archive_large_post(candidates[0])
+    ids = []
+    rows = 0
+    for pk in candidates:
+        rows += engagement_rows[pk]
+        if rows > max_rows:
+            break
+        ids.append(pk)
+
+    with transaction.atomic():
+        # Locking the posts keeps new likes and comments out until they are moved.
+        posts = list(Post.objects.select_for_update().filter(id__in=ids))
+        ids = [post.id for post in posts]
+        comments = defaultdict(list)
+        for row in Comment.objects.filter(post_id__in=ids).order_by('id').values(*COMMENT_FIELDS, 'post_id'):
+            comments[row.pop('post_id')].append(row)
+        likes = defaultdict(list)
+        for row in Like.objects.filter(post_id__in=ids).order_by('id').values(*LIKE_FIELDS, 'post_id'):
+            likes[row.pop('post_id')].append(row)
+
+        ArchivedPost.objects.bulk_create([
+            ArchivedPost(
+                id=post.id,
+                title=post.title,
+                content=post.content,
+                author_id=post.author_id,
+                created_at=post.created_at,
+                privacy=post.privacy,
+                likes_count=len(likes[post.id]),
+                comments_count=len(comments[post.id]),
+                engagement=ArchivedPost.pack_engagement(comments[post.id], likes[post.id]),
+            )
+            for post in posts
+        ])
+        Like.objects.filter(post_id__in=ids).delete()
+        Comment.objects.filter(post_id__in=ids).delete()
+        Post.all_objects.filter(id__in=ids).delete()
+        enqueue_cache_invalidation(keys=[f'post_{pk}' for pk in ids], patterns=['posts_*', 'newsfeed_*'])
+    for pk in ids:
+        _forget_likes(pk)
+    return len(ids)
+
+
+def archive_old_posts(days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE, max_batches=None, max_rows=ARCHIVE_MAX_ROWS):
+    cutoff = archive_cutoff(days)
+    archived = batches = 0
+    while max_batches is None or batches < max_batches:
+        count = archive_batch(cutoff, batch_size, max_rows)
+        if not count:
+            break
+        archived += count
+        batches += 1
+        logger.info(f"Archived {archived} posts older than {cutoff:%Y-%m-%d}.")
+    return archived
@@ -0,0 +1,92 @@
+"""
+Routes served straight from the ASGI application, in front of Django.
+
+Django runs each request inside its own ThreadSensitiveContext, which keeps
+an executor thread alive until the response is finished. For a stream that
+stays open for hours, that is one OS thread per connected client.
+"""
+import asyncio
+import json
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import connections
+from rest_framework.authtoken.models import Token
+from .events import get_broker, friend_ids_for, event_stream, read_stream_ticket
+
+User = get_user_model()
+
+# Same path as the 'newsfeed-stream' route, which only WSGI ever reaches.
+NEWSFEED_STREAM_PATH = '/posts/newsfeed/stream/'
+
+
+async def _stream_user_id(scope):
+    # EventSource cannot send headers, so browsers pass a signed ticket from
+    # newsfeed/stream/ticket/ instead of the long-lived API token.
+    headers = dict(scope['headers'])
+    authorization = headers.get(b'authorization', b'').decode('latin-1')
+    if authorization.startswith('Token '):
+        token = await Token.objects.select_related('user').filter(key=authorization[len('Token '):]).afirst()
+        return token.user_id if token and token.user.is_active else None
+    ticket = parse_qs(scope.get('query_string', b'').decode('latin-1')).get('ticket', [''])[0]
+    user_id = read_stream_ticket(ticket)
+    if user_id is not None and await User.objects.filter(pk=user_id, is_active=True).aexists():
+        return user_id
+    return None
+
+
+async def _send_json(send, status, data):
+    await send({'type': 'http.response.start', 'status': status, 'headers': [(b'content-type', b'application/json')]})
+    await send({'type': 'http.response.body', 'body': json.dumps(data).encode()})
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def newsfeed_stream(scope, receive, send):
+    """
+    Server-sent events with new posts and like-count deltas visible to the user.
+    Each idle client costs one queue and two tasks.
+    """
+    try:
+        user_id = await _stream_user_id(scope)
+        friend_ids = await sync_to_async(friend_ids_for)(user_id) if user_id is not None else None
+    finally:
+        # Django would close these when the request finished; this stream
+        # must not hold a database connection for as long as it stays open.
+        await sync_to_async(connections.close_all)()
+    if user_id is None:
+        await _send_json(send, 401, {'detail': 'Authentication credentials were not provided.'})
+        return
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no')],
+    })
+    stream = event_stream(get_broker(), user_id, friend_ids)
+
+    async def pump():
+        async for chunk in stream:
+            await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+
+    pumping = asyncio.ensure_future(pump())
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        await asyncio.wait([pumping, disconnected], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        pumping.cancel()
+        disconnected.cancel()
+        await asyncio.gather(pumping, disconnected, return_exceptions=True)
+        await stream.aclose()
+
+
+def with_stream_routes(django_application):
+    """Wraps the Django ASGI application so long-lived streams bypass its request handler."""
+    async def application(scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] == NEWSFEED_STREAM_PATH:
+            return await newsfeed_stream(scope, receive, send)
+        return await django_application(scope, receive, send)
+    return application
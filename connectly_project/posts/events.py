@@ -0,0 +1,194 @@
+import asyncio
+import json
+import os
+import threading
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from .models import Friendship
+from singletons.logger_singleton import LoggerSingleton
+
+logger = LoggerSingleton().get_logger()
+
+EVENT_BROKER = getattr(settings, 'EVENT_BROKER', 'memory')
+EVENT_CHANNEL = getattr(settings, 'EVENT_CHANNEL', 'connectly:events')
+EVENT_QUEUE_SIZE = getattr(settings, 'EVENT_QUEUE_SIZE', 100)
+SSE_KEEPALIVE_SECONDS = getattr(settings, 'SSE_KEEPALIVE_SECONDS', 15)
+EVENT_RECONNECT_MAX_SECONDS = getattr(settings, 'EVENT_RECONNECT_MAX_SECONDS', 30)
+SSE_TICKET_MAX_AGE = getattr(settings, 'SSE_TICKET_MAX_AGE', 60)
+STREAM_TICKET_SALT = 'posts.newsfeed_stream'
+
+
+def make_stream_ticket(user_id):
+    """
+    A signed, short-lived credential for EventSource, which cannot send an
+    Authorization header. Safe to appear in access logs once expired.
+    """
+    return signing.dumps(user_id, salt=STREAM_TICKET_SALT)
+
+
+def read_stream_ticket(ticket):
+    """Returns the ticket's user id, or None if it is forged or expired."""
+    try:
+        return signing.loads(ticket, salt=STREAM_TICKET_SALT, max_age=SSE_TICKET_MAX_AGE)
+    except signing.BadSignature:
+        return None
+
+
+def friend_ids_for(user_id):
+    pairs = Friendship.objects.filter(
+        Q(from_user_id=user_id) | Q(to_user_id=user_id),
+        accepted=True
+    ).values_list('from_user_id', 'to_user_id')
+    return frozenset(a if b == user_id else b for a, b in pairs)
+
+
+class Subscription:
+    __slots__ = ('user_id', 'friend_ids', 'queue')
+
+    def __init__(self, user_id, friend_ids):
+        self.user_id = user_id
+        self.friend_ids = friend_ids
+        self.queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+
+    def accepts(self, event):
+        author_id = event['author_id']
+        if event['privacy'] == 'PUBLIC' or author_id == self.user_id:
+            return True
+        return event['privacy'] == 'FRIENDS' and author_id in self.friend_ids
+
+
+class EventBroker:
+    """Fans events out to the SSE clients connected to this worker."""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._loop = None
+
+    def subscribe(self, user_id, friend_ids):
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(user_id, friend_ids)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self._subscribers.discard(subscription)
+
+    @property
+    def connection_count(self):
+        return len(self._subscribers)
+
+    def _deliver(self, event):
+        for subscription in list(self._subscribers):
+            if not subscription.accepts(event):
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow client; it will catch up from the REST feed.
+                pass
+
+    def publish(self, event):
+        """Safe to call from sync views running outside the event loop."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._deliver(event)
+        else:
+            loop.call_soon_threadsafe(self._deliver, event)
+
+
+class RedisEventBroker(EventBroker):
+    """
+    Publishes through Redis pub/sub so events reach clients on every worker,
+    including events raised by WSGI workers and management commands.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+        # Named so the listener can be found (or killed) in CLIENT LIST.
+        self.client_name = f'connectly-events-{os.getpid()}-{id(self)}'
+
+    def subscribe(self, user_id, friend_ids):
+        subscription = super().subscribe(user_id, friend_ids)
+        if self._listener is None or self._listener.done():
+            self._listener = self._loop.create_task(self._listen())
+        return subscription
+
+    async def _listen(self):
+        import redis.asyncio as aioredis
+        delay = 1
+        while True:
+            client = aioredis.from_url(settings.CACHES['default']['LOCATION'], client_name=self.client_name)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(EVENT_CHANNEL)
+                delay = 1
+                async for message in pubsub.listen():
+                    if message['type'] == 'message':
+                        self._deliver(json.loads(message['data']))
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.error(f"Event listener lost Redis, reconnecting in {delay}s: {exc}")
+            finally:
+                try:
+                    await pubsub.aclose()
+                    await client.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, EVENT_RECONNECT_MAX_SECONDS)
+
+    def publish(self, event):
+        from django_redis import get_redis_connection
+        get_redis_connection('default').publish(EVENT_CHANNEL, json.dumps(event, default=str))
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = RedisEventBroker() if EVENT_BROKER == 'redis' else EventBroker()
+        return _broker
+
+
+def publish_event(event_type, post, **data):
+    get_broker().publish({
+        'type': event_type,
+        'author_id': post.author_id,
+        'privacy': post.privacy,
+        'post_id': post.id,
+        **data,
+    })
+
+
+def format_event(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+async def event_stream(broker, user_id, friend_ids):
+    # Subscribing here rather than in the view ties the subscription to the
+    # generator's lifetime: if iteration never starts, nothing is registered.
+    subscription = broker.subscribe(user_id, friend_ids)
+    try:
+        yield ': connected\n\n'
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(subscription)
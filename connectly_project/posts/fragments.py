@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.db.models import Count
+from rest_framework.response import Response
+from .models import Post
+from .serializers import PostSerializer
+from .like_buffer import with_live_like_counts
+from singletons.config_manager import ConfigManager
+
+config = ConfigManager()
+
+
+def fragment_key(post_id):
+    return f'post_{post_id}'
+
+
+def post_fragments(post_ids, request):
+    """
+    Returns serialized posts in the order of post_ids. Cached fragments are
+    fetched with one get_many; only the missing posts are loaded, in one query.
+    """
+    cached = cache.get_many([fragment_key(pk) for pk in post_ids])
+    missing = [pk for pk in post_ids if fragment_key(pk) not in cached]
+    if missing:
+        posts = Post.objects.filter(id__in=missing).select_related('author').annotate(likes_total=Count('likes'))
+        serializer = PostSerializer(posts, many=True, context={'request': request})
+        fresh = {fragment_key(item['id']): item for item in serializer.data}
+        cache.set_many(fresh, timeout=config.snapshot.CACHE_TTL)
+        cached.update(fresh)
+    # Posts deleted since the id list was cached are skipped.
+    return with_live_like_counts([cached[fragment_key(pk)] for pk in post_ids if fragment_key(pk) in cached])
+
+
+def paginated_post_ids(queryset, request, paginator, cache_key):
+    """Caches just the ids and pagination links of a page of posts."""
+    # The page size can change at runtime, so it is part of the key.
+    cache_key = f'{cache_key}_size{paginator.get_page_size(request)}'
+    page = cache.get(cache_key)
+    if page is None:
+        ids = paginator.paginate_queryset(queryset.values_list('id', flat=True), request)
+        page = {
+            'count': paginator.page.paginator.count,
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+            'ids': list(ids),
+        }
+        cache.set(cache_key, page, timeout=config.snapshot.CACHE_TTL)
+    return page
+
+
+def post_page_response(queryset, request, paginator, cache_key):
+    if not config.snapshot.POST_FRAGMENT_CACHE:
+        page = paginator.paginate_queryset(queryset.select_related('author').annotate(likes_total=Count('likes')), request)
+        serializer = PostSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(with_live_like_counts(serializer.data))
+    page = paginated_post_ids(queryset, request, paginator, cache_key)
+    return Response({
+        'count': page['count'],
+        'next': page['next'],
+        'previous': page['previous'],
+        'results': post_fragments(page['ids'], request),
+    })
@@ -0,0 +1,99 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, make_password, check_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+HASH_WORKERS = getattr(settings, 'PASSWORD_HASH_WORKERS', 2)
+HASH_QUEUE_LIMIT = getattr(settings, 'PASSWORD_HASH_QUEUE_LIMIT', 32)
+HASH_ADMISSION_TIMEOUT = getattr(settings, 'PASSWORD_HASH_ADMISSION_TIMEOUT', 0.5)
+
+
+class TunableArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2 with cost parameters taken from settings. Stored hashes made with
+    other parameters report must_update, so they are rehashed on next login.
+    """
+    time_cost = getattr(settings, 'ARGON2_TIME_COST', Argon2PasswordHasher.time_cost)
+    memory_cost = getattr(settings, 'ARGON2_MEMORY_COST', Argon2PasswordHasher.memory_cost)
+    parallelism = getattr(settings, 'ARGON2_PARALLELISM', Argon2PasswordHasher.parallelism)
+
+
+class HashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many concurrent logins, please retry shortly.'
+    default_code = 'hashing_busy'
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(HASH_QUEUE_LIMIT)
+
+
+def _init_worker():
+    django.setup()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # forkserver: forking this process could copy a lock held by
+            # another thread (config poller, request threads) into the child.
+            _pool = ProcessPoolExecutor(
+                max_workers=HASH_WORKERS,
+                mp_context=multiprocessing.get_context('forkserver'),
+                initializer=_init_worker
+            )
+        return _pool
+
+
+def reset_pool():
+    """Drops the pool without waiting; call in a freshly forked worker."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _verify(raw_password, encoded):
+    outcome = {'must_update': False}
+
+    def setter(raw):
+        outcome['must_update'] = True
+
+    return check_password(raw_password, encoded, setter=setter), outcome['must_update']
+
+
+def _run(func, *args):
+    if not HASH_WORKERS:
+        return func(*args)
+    # Admission control: reject instead of queueing without bound.
+    if not _slots.acquire(timeout=HASH_ADMISSION_TIMEOUT):
+        raise HashingBusy()
+    try:
+        try:
+            return _get_pool().submit(func, *args).result()
+        except BrokenProcessPool:
+            # A hashing process died (e.g. OOM-killed); start a fresh pool once.
+            reset_pool()
+            return _get_pool().submit(func, *args).result()
+    finally:
+        _slots.release()
+
+
+def hash_password(raw_password):
+    return _run(make_password, raw_password)
+
+
+def verify_password(raw_password, encoded):
+    """
+    Returns (valid, must_update). must_update is True when the stored hash
+    was made with an outdated hasher or cost parameters.
+    """
+    return _run(_verify, raw_password, encoded)
@@ -0,0 +1,229 @@
+from django.conf import settings
+from django.core.cache import cache
+from django_redis import get_redis_connection
+from .models import Post, Like
+from singletons.config_manager import ConfigManager
+
+BUFFER_KEY = 'like_buffer:{post_id}'
+INFLIGHT_KEY = 'like_buffer:{post_id}:inflight'
+USERS_KEY = 'like_users:{post_id}'
+COUNT_KEY = 'like_count:{post_id}'
+DIRTY_KEY = 'like_buffer:dirty'
+FLUSH_BATCH_SIZE = getattr(settings, 'LIKE_FLUSH_BATCH_SIZE', 500)
+SEED_CHUNK_SIZE = getattr(settings, 'LIKE_SEED_CHUNK_SIZE', 1000)
+# The likers set and count only mirror the Like table, so they may expire;
+# the buffer and inflight sets hold unflushed likes and never do.
+MIRROR_TTL = getattr(settings, 'LIKE_MIRROR_TTL', 60 * 60 * 24)
+
+# KEYS: users, buffer, dirty, count  ARGV: user_id, post_id, ttl
+BUFFER_SCRIPT = """
+if redis.call('SADD', KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+redis.call('SADD', KEYS[2], ARGV[1])
+redis.call('SADD', KEYS[3], ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[4], ARGV[3])
+return 1
+"""
+
+# KEYS: buffer, inflight  ARGV: batch_size
+MOVE_SCRIPT = """
+local members = redis.call('SPOP', KEYS[1], ARGV[1])
+if #members > 0 then
+    redis.call('SADD', KEYS[2], unpack(members))
+end
+return members
+"""
+
+# KEYS: count, users  ARGV: user_id
+RECORD_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 and redis.call('SADD', KEYS[2], ARGV[1]) == 1 then
+    redis.call('INCR', KEYS[1])
+end
+"""
+
+
+def write_behind_enabled():
+    return ConfigManager().snapshot.LIKE_WRITE_BEHIND
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def _keys(post_id):
+    return (
+        BUFFER_KEY.format(post_id=post_id),
+        INFLIGHT_KEY.format(post_id=post_id),
+        USERS_KEY.format(post_id=post_id),
+        COUNT_KEY.format(post_id=post_id),
+    )
+
+
+def _needs_seed(conn, post_id):
+    buffer_key, inflight_key, users_key, count_key = _keys(post_id)
+    pipe = conn.pipeline()
+    pipe.get(count_key)
+    pipe.exists(users_key)
+    pipe.scard(buffer_key)
+    pipe.scard(inflight_key)
+    count, users, buffered, inflight = pipe.execute()
+    if count is None:
+        return True
+    # The likers set was evicted on its own while there was something to mirror.
+    return not users and (int(count) or buffered or inflight)
+
+
+def _seed(conn, post_id):
+    """
+    Loads a post's persisted likers and count into Redis, so later likes are
+    de-duplicated and counted without touching the database. Runs again if
+    the mirror expired or was evicted.
+    """
+    if not _needs_seed(conn, post_id):
+        return
+    buffer_key, inflight_key, users_key, count_key = _keys(post_id)
+    conn.delete(users_key)
+    count = 0
+    chunk = []
+    user_ids = Like.objects.filter(post_id=post_id).values_list('user_id', flat=True)
+    for user_id in user_ids.iterator(chunk_size=SEED_CHUNK_SIZE):
+        chunk.append(user_id)
+        if len(chunk) == SEED_CHUNK_SIZE:
+            conn.sadd(users_key, *chunk)
+            count += len(chunk)
+            chunk = []
+    pipe = conn.pipeline()
+    if chunk:
+        pipe.sadd(users_key, *chunk)
+    # Buffered likes are not in the table yet but must still be de-duplicated.
+    pipe.sunionstore(users_key, [users_key, buffer_key, inflight_key])
+    pipe.expire(users_key, MIRROR_TTL)
+    pipe.set(count_key, count + len(chunk), ex=MIRROR_TTL)
+    pipe.execute()
+
+
+def buffer_like(user_id, post_id):
+    """
+    Records a like in the per-post Redis buffer.
+    Returns False if the user already liked the post (buffered or persisted).
+    """
+    conn = _redis()
+    _seed(conn, post_id)
+    buffer_key, _, users_key, count_key = _keys(post_id)
+    return bool(conn.register_script(BUFFER_SCRIPT)(
+        keys=[users_key, buffer_key, DIRTY_KEY, count_key],
+        args=[user_id, post_id, MIRROR_TTL]
+    ))
+
+
+def record_persisted_like(user_id, post_id):
+    """Keeps the Redis count in step with likes written directly to the table."""
+    _, _, users_key, count_key = _keys(post_id)
+    _redis().register_script(RECORD_SCRIPT)(keys=[count_key, users_key], args=[user_id])
+
+
+def live_like_counts(post_ids):
+    """
+    Persisted + buffered like counts for posts the buffer knows about, read
+    from Redis in one round trip. Posts never seeded are left out.
+    """
+    pipe = _redis().pipeline()
+    for post_id in post_ids:
+        buffer_key, inflight_key, _, count_key = _keys(post_id)
+        pipe.get(count_key)
+        pipe.scard(buffer_key)
+        pipe.scard(inflight_key)
+    results = pipe.execute()
+    counts = {}
+    for i, post_id in enumerate(post_ids):
+        persisted, buffered, inflight = results[i * 3:i * 3 + 3]
+        if persisted is not None:
+            counts[post_id] = int(persisted) + buffered + inflight
+    return counts
+
+
+def with_live_like_counts(items):
+    """Overlays live like counts on serialized posts (cached fragments included)."""
+    if not write_behind_enabled() or not items:
+        return items
+    counts = live_like_counts([item['id'] for item in items])
+    return [
+        {**item, 'likes_count': counts[item['id']]} if item['id'] in counts else item
+        for item in items
+    ]
+
+
+def forget_post(post_id):
+    """Drops a post's Redis state. Returns the number of unflushed likes discarded."""
+    buffer_key, inflight_key, _, _ = _keys(post_id)
+    pipe = _redis().pipeline()
+    pipe.scard(buffer_key)
+    pipe.scard(inflight_key)
+    pipe.delete(*_keys(post_id))
+    pipe.srem(DIRTY_KEY, post_id)
+    buffered, inflight, _, _ = pipe.execute()
+    return buffered + inflight
+
+
+def _flush_post(conn, post_id, batch_size):
+    buffer_key, inflight_key, _, count_key = _keys(post_id)
+    move = conn.register_script(MOVE_SCRIPT)
+    flushed = 0
+    while True:
+        # Leftovers from a crashed flush are retried before taking a new batch.
+        user_ids = [int(u) for u in conn.smembers(inflight_key)]
+        if not user_ids:
+            user_ids = [int(u) for u in move(keys=[buffer_key, inflight_key], args=[batch_size])]
+        if not user_ids:
+            return flushed
+        # ignore_conflicts skips rows a crashed flush already wrote, or likes
+        # the Redis mirror no longer knew about.
+        Like.objects.bulk_create(
+            [Like(post_id=post_id, user_id=user_id) for user_id in user_ids],
+            batch_size=batch_size,
+            ignore_conflicts=True
+        )
+        # The persisted count is re-read rather than incremented, so a drifted
+        # mirror is corrected here instead of counting skipped rows. Readers
+        # add buffer + inflight to it, so one MULTI never double counts.
+        persisted = Like.objects.filter(post_id=post_id).count()
+        pipe = conn.pipeline(transaction=True)
+        pipe.set(count_key, persisted, ex=MIRROR_TTL)
+        pipe.delete(inflight_key)
+        pipe.execute()
+        flushed += len(user_ids)
+
+
+def flush_likes(batch_size=FLUSH_BATCH_SIZE, post_ids=None):
+    """
+    Moves buffered likes into the Like table with batched bulk_create calls,
+    for every post with buffered likes or only those in post_ids.
+    Returns the number of likes flushed.
+    """
+    conn = _redis()
+    flushed = 0
+    if post_ids is None:
+        post_ids = [int(raw_post_id) for raw_post_id in conn.smembers(DIRTY_KEY)]
+    else:
+        # Checked directly, since a crashed flush leaves inflight likes unmarked.
+        pipe = conn.pipeline()
+        for post_id in post_ids:
+            buffer_key, inflight_key, _, _ = _keys(post_id)
+            pipe.exists(buffer_key, inflight_key)
+        post_ids = [post_id for post_id, pending in zip(post_ids, pipe.execute()) if pending]
+    for post_id in post_ids:
+        # Drop the dirty marker first so likes arriving mid-flush re-add it.
+        conn.srem(DIRTY_KEY, post_id)
+        if not Post.objects.filter(pk=post_id).exists():
+            # Deleted (or soft-deleted) since the like was buffered.
+            forget_post(post_id)
+            continue
+        count = _flush_post(conn, post_id, batch_size)
+        if count:
+            cache.delete(f'post_{post_id}')
+            flushed += count
+    if flushed:
+        cache.delete('all_likes')
+    return flushed
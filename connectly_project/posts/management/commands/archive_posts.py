@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from posts.archive import archive_old_posts, ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, ARCHIVE_MAX_ROWS
+
+
+class Command(BaseCommand):
+    help = 'Moves old posts with their comments and likes into the archive table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--max-rows', type=int, default=ARCHIVE_MAX_ROWS, help='Comments and likes moved per transaction.')
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches.')
+
+    def handle(self, *args, **options):
+        archived = archive_old_posts(
+            days=options['older_than_days'],
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+            max_rows=options['max_rows']
+        )
+        self.stdout.write(f"Archived {archived} posts.")
@@ -0,0 +1,63 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from django.contrib.auth import authenticate, get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from posts.hashing import HashingBusy
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Measures registration and login throughput through the password hashing pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--concurrency', type=int, default=8)
+
+    def _timed(self, label, func, items, concurrency):
+        rejected = 0
+
+        def call(item):
+            nonlocal rejected
+            try:
+                return func(item)
+            except HashingBusy:
+                rejected += 1
+            finally:
+                connection.close()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(call, items))
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"{label}: {len(items)} in {elapsed:.2f}s "
+            f"({len(items) / elapsed:.1f}/s), rejected={rejected}"
+        )
+        return results
+
+    def handle(self, *args, **options):
+        prefix = f"bench_{uuid.uuid4().hex[:8]}_"
+        password = uuid.uuid4().hex
+        usernames = [f"{prefix}{i}" for i in range(options['users'])]
+
+        try:
+            self._timed(
+                'register',
+                lambda username: User.objects.create_user(username=username, password=password),
+                usernames,
+                options['concurrency']
+            )
+            results = self._timed(
+                'login',
+                lambda username: authenticate(username=username, password=password),
+                usernames,
+                options['concurrency']
+            )
+            failed = sum(1 for user in results if user is None)
+            if failed:
+                self.stderr.write(f"{failed} logins did not authenticate.")
+        finally:
+            User.objects.filter(username__startswith=prefix).delete()
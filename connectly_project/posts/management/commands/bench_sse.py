@@ -0,0 +1,128 @@
+import asyncio
+import resource
+import time
+import tracemalloc
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from posts.asgi import with_stream_routes
+from posts.events import get_broker, make_stream_ticket
+
+User = get_user_model()
+
+
+class StreamConnection:
+    """
+    One HTTP connection to newsfeed/stream/, driven through the ASGI protocol
+    the way a server such as uvicorn or daphne would, minus the socket.
+    """
+
+    def __init__(self, ticket, port, received):
+        self.scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'https',
+            'path': '/posts/newsfeed/stream/',
+            'raw_path': b'/posts/newsfeed/stream/',
+            'query_string': f'ticket={ticket}'.encode(),
+            'root_path': '',
+            'headers': [(b'host', b'localhost'), (b'accept', b'text/event-stream')],
+            'client': ('127.0.0.1', port),
+            'server': ('localhost', 443),
+        }
+        self.status = None
+        self.opened = asyncio.Event()
+        self._received = received
+        self._request_sent = False
+        self._disconnected = asyncio.Event()
+
+    async def receive(self):
+        if not self._request_sent:
+            self._request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self._disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+            if self.status != 200:
+                self.opened.set()
+        elif message['type'] == 'http.response.body':
+            body = message.get('body', b'')
+            if body.startswith(b': connected'):
+                self.opened.set()
+            elif body.startswith(b'event:'):
+                self._received()
+
+    def disconnect(self):
+        self._disconnected.set()
+
+
+class Command(BaseCommand):
+    help = (
+        'Holds many idle newsfeed streams open through the ASGI application on one '
+        'event loop and measures memory and fan-out latency. Sockets and kernel '
+        'buffers are not included; load-test a real ASGI server for those.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=10000)
+        parser.add_argument('--events', type=int, default=10)
+
+    async def _run(self, connections, events):
+        application = with_stream_routes(get_asgi_application())
+        user, _ = await sync_to_async(User.objects.get_or_create)(username='bench_sse')
+        ticket = make_stream_ticket(user.id)
+        delivered = [0]
+        done = asyncio.Event()
+        expected = connections * events
+
+        def received():
+            delivered[0] += 1
+            if delivered[0] == expected:
+                done.set()
+
+        clients = [StreamConnection(ticket, 10000 + i % 50000, received) for i in range(connections)]
+        try:
+            tracemalloc.start()
+            baseline = tracemalloc.get_traced_memory()[0]
+            rss_baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            start = time.perf_counter()
+            tasks = [asyncio.create_task(application(c.scope, c.receive, c.send)) for c in clients]
+            await asyncio.wait_for(asyncio.gather(*(c.opened.wait() for c in clients)), timeout=600)
+            connect_elapsed = time.perf_counter() - start
+            per_connection = (tracemalloc.get_traced_memory()[0] - baseline) / connections
+            rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_baseline
+            tracemalloc.stop()
+
+            refused = sum(1 for c in clients if c.status != 200)
+            if refused:
+                raise CommandError(f"{refused} of {connections} streams were refused.")
+            self.stdout.write(
+                f"{connections} idle ASGI streams opened in {connect_elapsed:.2f}s, "
+                f"~{per_connection / 1024:.1f} KiB Python heap each, "
+                f"peak RSS +{rss_growth / 1024:.0f} MiB"
+            )
+
+            start = time.perf_counter()
+            broker = get_broker()
+            for post_id in range(events):
+                broker.publish({'type': 'post.created', 'author_id': -1, 'privacy': 'PUBLIC', 'post_id': post_id})
+            await asyncio.wait_for(done.wait(), timeout=120)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{expected} deliveries in {elapsed:.2f}s ({expected / elapsed:.0f}/s)"
+            )
+
+            for client in clients:
+                client.disconnect()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            await sync_to_async(user.delete)()
+
+    def handle(self, *args, **options):
+        asyncio.run(self._run(options['connections'], options['events']))
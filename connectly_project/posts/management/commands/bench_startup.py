@@ -0,0 +1,101 @@
+import json
+import statistics
+import subprocess
+import sys
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+BUDGET_FILE = settings.BASE_DIR / 'startup_budget.json'
+# Budgets are multiples of this run's baseline, so a slower machine or a busy
+# CI runner scales both sides instead of failing on absolute milliseconds.
+HEADROOM = 1.5
+
+# Interpreter start plus a fixed, project-independent import workload.
+BASELINE = [
+    sys.executable, '-c',
+    'import asyncio, decimal, email.mime.multipart, http.server, unittest, xml.dom.minidom, django.db.models, django.http'
+]
+
+TARGETS = {
+    'manage': [sys.executable, 'manage.py', 'check'],
+    'wsgi': [sys.executable, '-c', 'import connectly_project.wsgi'],
+    'asgi': [sys.executable, '-c', 'import connectly_project.asgi'],
+    'urls': [
+        sys.executable, '-c',
+        'import connectly_project.wsgi; from django.urls import get_resolver; get_resolver().url_patterns'
+    ],
+}
+
+
+def _time_once(command):
+    start = time.perf_counter()
+    subprocess.run(command, cwd=settings.BASE_DIR, check=True, capture_output=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def _slowest_imports(command, top):
+    """Parses `python -X importtime` output into (cumulative_us, module) pairs."""
+    result = subprocess.run(
+        [command[0], '-X', 'importtime', *command[1:]],
+        cwd=settings.BASE_DIR, check=True, capture_output=True, text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        rows.append((int(cumulative), module.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures cold start of manage.py, wsgi.py and asgi.py relative to a baseline '
+        'measured in the same run, against startup_budget.json.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--profile', type=int, default=0, metavar='N', help='Also list the N slowest imports per target.')
+        parser.add_argument(
+            '--update-budget', action='store_true',
+            help=f'Store measured ratios times {HEADROOM} as the new budget.'
+        )
+
+    def handle(self, *args, **options):
+        budget = json.loads(BUDGET_FILE.read_text()) if BUDGET_FILE.exists() else {}
+        commands = {'baseline': BASELINE, **TARGETS}
+        samples = {name: [] for name in commands}
+        # Interleaved, so drift in machine load hits every target alike.
+        for _ in range(options['runs']):
+            for name, command in commands.items():
+                samples[name].append(_time_once(command))
+        self.stdout.write(f"baseline: median {statistics.median(samples['baseline']):.0f} ms")
+
+        ratios = {}
+        over = []
+        for name, command in TARGETS.items():
+            # Each run is compared with the baseline taken right before it, and
+            # the median of those ratios drops the odd slow or fast outlier.
+            ratios[name] = statistics.median(
+                target / baseline for target, baseline in zip(samples[name], samples['baseline'])
+            )
+            limit = budget.get(name)
+            status = 'no budget' if limit is None else ('OK' if ratios[name] <= limit else 'OVER')
+            if status == 'OVER':
+                over.append(name)
+            self.stdout.write(
+                f"{name}: median {statistics.median(samples[name]):.0f} ms, {ratios[name]:.2f}x baseline "
+                f"(budget {limit}x) {status}"
+            )
+            if options['profile']:
+                for cumulative, module in _slowest_imports(command, options['profile']):
+                    self.stdout.write(f"    {cumulative / 1000:8.1f} ms  {module}")
+
+        if options['update_budget']:
+            new_budget = {name: round(ratio * HEADROOM, 2) for name, ratio in ratios.items()}
+            BUDGET_FILE.write_text(json.dumps(new_budget, indent=4) + '\n')
+            self.stdout.write(f"Budget written to {BUDGET_FILE}.")
+        elif over:
+            raise CommandError(f"Startup over budget: {', '.join(over)}")
@@ -0,0 +1,40 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from singletons.config_manager import ConfigManager
+
+
+class Command(BaseCommand):
+    help = 'Shows or changes runtime settings shared by all workers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', nargs='?', choices=['show', 'set', 'reset'], default='show')
+        parser.add_argument('key', nargs='?')
+        parser.add_argument('value', nargs='?', help='JSON value, e.g. 25, true or "text".')
+
+    def handle(self, *args, **options):
+        manager = ConfigManager()
+        manager.refresh()
+        action, key = options['action'], options['key']
+
+        if action == 'set':
+            if key is None or options['value'] is None:
+                raise CommandError('Usage: config set KEY VALUE')
+            try:
+                value = json.loads(options['value'])
+            except ValueError:
+                value = options['value']
+            try:
+                manager.set_setting(key, value)
+            except ValueError as exc:
+                raise CommandError(str(exc))
+        elif action == 'reset':
+            if key is None:
+                raise CommandError('Usage: config reset KEY')
+            try:
+                manager.reset_setting(key)
+            except ValueError as exc:
+                raise CommandError(str(exc))
+
+        self.stdout.write(f"version {manager.snapshot.version}")
+        for name, value in sorted(manager.snapshot.as_dict().items()):
+            self.stdout.write(f"{name} = {json.dumps(value)}")
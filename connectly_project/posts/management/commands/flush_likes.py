@@ -0,0 +1,25 @@
+import time
+from django.core.management.base import BaseCommand
+from posts.like_buffer import flush_likes, FLUSH_BATCH_SIZE
+from singletons.logger_singleton import LoggerSingleton
+
+logger = LoggerSingleton().get_logger()
+
+
+class Command(BaseCommand):
+    help = 'Flushes buffered likes from Redis into the Like table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=FLUSH_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help='Keep flushing until interrupted.')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds between flushes in loop mode.')
+
+    def handle(self, *args, **options):
+        while True:
+            flushed = flush_likes(batch_size=options['batch_size'])
+            if flushed:
+                logger.info(f"Flushed {flushed} buffered likes.")
+            if not options['loop']:
+                self.stdout.write(f"Flushed {flushed} likes.")
+                return
+            time.sleep(options['interval'])
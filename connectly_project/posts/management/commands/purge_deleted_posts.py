@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from posts.purge import purge_post, purge_status, PURGE_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Purges likes and comments of soft-deleted posts in bounded chunks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=PURGE_CHUNK_SIZE)
+        parser.add_argument('--status', action='store_true', help='List posts awaiting purge and exit.')
+
+    def handle(self, *args, **options):
+        pending = purge_status()
+        if options['status']:
+            for row in pending:
+                self.stdout.write(
+                    f"post={row['id']} deleted_at={row['deleted_at']:%Y-%m-%d %H:%M:%S} "
+                    f"likes={row['remaining_likes']} comments={row['remaining_comments']}"
+                )
+            self.stdout.write(f"{len(pending)} posts awaiting purge.")
+            return
+
+        for row in pending:
+            purge_post(row['id'], chunk_size=options['chunk_size'])
+        self.stdout.write(f"Purged {len(pending)} posts.")
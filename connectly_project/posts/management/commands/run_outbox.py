@@ -0,0 +1,38 @@
+import time
+from django.core.management.base import BaseCommand
+from posts.outbox import process_batch, outbox_metrics, purge_processed, BATCH_SIZE
+from singletons.logger_singleton import LoggerSingleton
+
+logger = LoggerSingleton().get_logger()
+
+
+class Command(BaseCommand):
+    help = 'Drains the transactional outbox, running queued side effects.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--once', action='store_true', help='Drain a single batch and exit.')
+        parser.add_argument('--interval', type=float, default=0.5, help='Seconds to sleep when the outbox is empty.')
+        parser.add_argument('--stats', action='store_true', help='Print queue depth and lag, then exit.')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            metrics = outbox_metrics()
+            self.stdout.write(
+                f"queue_depth={metrics['queue_depth']} "
+                f"lag_seconds={metrics['lag_seconds']:.2f} "
+                f"failed={metrics['failed']}"
+            )
+            return
+
+        last_purge = time.monotonic()
+        while True:
+            processed = process_batch(batch_size=options['batch_size'])
+            if options['once']:
+                self.stdout.write(f"Processed {processed} events.")
+                return
+            if time.monotonic() - last_purge > 3600:
+                logger.info(f"Purged {purge_processed()} processed outbox events.")
+                last_purge = time.monotonic()
+            if processed < options['batch_size']:
+                time.sleep(options['interval'])
@@ -0,0 +1,17 @@
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+from .hashing import HashingBusy
+
+
+class HashingBusyMiddleware(MiddlewareMixin):
+    """
+    DRF views turn HashingBusy into a 503 themselves; this does the same for
+    plain Django views such as the admin and allauth form logins.
+    """
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, HashingBusy):
+            response = HttpResponse(str(exception.detail), status=exception.status_code, content_type='text/plain')
+            response['Retry-After'] = '1'
+            return response
+        return None
@@ -1,7 +1,11 @@
+import json
+import zlib
 from django.db import models
 from django.contrib.auth.models import AbstractUser, Group, Permission
 from django.conf import settings
 from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+from .hashing import hash_password, verify_password
 
 class User(AbstractUser):
     # Temporary nullable fields to allow migration
@@ -32,6 +36,19 @@ class User(AbstractUser):
         related_query_name='custom_user_permission'
     )
 
+    # Hashing runs in the worker pool from posts.hashing instead of the request thread.
+    def set_password(self, raw_password):
+        self.password = hash_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        valid, must_update = verify_password(raw_password, self.password)
+        if valid and must_update:
+            self.set_password(raw_password)
+            self._password = None
+            self.save(update_fields=['password'])
+        return valid
+
 class PrivacySettings(models.Model):
     PRIVACY_CHOICES = [
         ('PUBLIC', 'Public - Visible to everyone'),
@@ -45,12 +62,21 @@ class PrivacySettings(models.Model):
     def __str__(self):
         return f"Privacy settings for {self.user.username}"
 
+class PostManager(models.Manager):
+    def get_queryset(self):
+        # Soft-deleted posts stay hidden until the purge job removes them.
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
 class Post(models.Model):
     title = models.CharField(max_length=200)
     content = models.TextField()
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     privacy = models.CharField(max_length=10, choices=PrivacySettings.PRIVACY_CHOICES, default='PUBLIC')
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    objects = PostManager()
+    all_objects = models.Manager()
 
     def __str__(self):
         return self.title
@@ -59,6 +85,9 @@ class Post(models.Model):
         permissions = [
             ("view_private_post", "Can view private posts"),
         ]
+        indexes = [
+            models.Index(fields=['created_at'], name='post_created_at_idx'),
+        ]
 
 class Comment(models.Model):
     text = models.TextField()
@@ -99,4 +128,50 @@ class Friendship(models.Model):
         verbose_name_plural = 'friendships'
 
     def __str__(self):
-        return f"{self.from_user} → {self.to_user} ({'accepted' if self.accepted else 'pending'})"
\ No newline at end of file
+        return f"{self.from_user} → {self.to_user} ({'accepted' if self.accepted else 'pending'})"
+
+class OutboxEvent(models.Model):
+    topic = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    claim_token = models.CharField(max_length=32, blank=True, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['processed_at', 'available_at'], name='outbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} ({'processed' if self.processed_at else 'pending'})"
+
+
+class ArchivedPost(models.Model):
+    """
+    A post moved out of the hot tables by `manage.py archive_posts`.
+    Comments and likes are kept as one zlib-compressed JSON blob.
+    """
+    id = models.BigIntegerField(primary_key=True)  # id of the original Post
+    title = models.CharField(max_length=200)
+    content = models.TextField()
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='archived_posts', on_delete=models.CASCADE)
+    created_at = models.DateTimeField()
+    privacy = models.CharField(max_length=10, choices=PrivacySettings.PRIVACY_CHOICES, default='PUBLIC')
+    likes_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+    engagement = models.BinaryField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    @staticmethod
+    def pack_engagement(comments, likes):
+        return zlib.compress(json.dumps({'comments': comments, 'likes': likes}, default=str).encode())
+
+    def unpack_engagement(self):
+        return json.loads(zlib.decompress(bytes(self.engagement)))
+
+    def __str__(self):
+        return f"{self.title} (archived)"
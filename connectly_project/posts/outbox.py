@@ -0,0 +1,158 @@
+import time
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Min
+from django.utils import timezone
+from .models import OutboxEvent
+from singletons.logger_singleton import LoggerSingleton
+
+logger = LoggerSingleton().get_logger()
+
+BATCH_SIZE = getattr(settings, 'OUTBOX_BATCH_SIZE', 100)
+MAX_ATTEMPTS = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 5)
+LEASE_SECONDS = getattr(settings, 'OUTBOX_LEASE_SECONDS', 30)
+
+CACHE_INVALIDATE = 'cache.invalidate'
+
+HANDLERS = {}
+
+
+def handler(topic):
+    def register(func):
+        HANDLERS[topic] = func
+        return func
+    return register
+
+
+def enqueue(topic, payload):
+    """
+    Records a side effect to run after commit.
+    Call inside the same transaction.atomic() block as the model change.
+    """
+    return OutboxEvent.objects.create(topic=topic, payload=payload)
+
+
+def enqueue_cache_invalidation(keys=(), patterns=()):
+    return enqueue(CACHE_INVALIDATE, {'keys': list(keys), 'patterns': list(patterns)})
+
+
+@handler(CACHE_INVALIDATE)
+def invalidate_cache(payload):
+    if payload.get('keys'):
+        cache.delete_many(payload['keys'])
+    for pattern in payload.get('patterns', []):
+        cache.delete_pattern(pattern)
+
+
+def pending_events():
+    return OutboxEvent.objects.filter(processed_at__isnull=True, attempts__lt=MAX_ATTEMPTS)
+
+
+def _claim(batch_size):
+    """
+    Leases up to batch_size due events to this run with a single UPDATE.
+    The lease conditions are repeated on the outer query, so a row another
+    worker claimed in the meantime is skipped rather than taken over.
+    """
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    due = (
+        pending_events()
+        .filter(available_at__lte=now)
+        .exclude(locked_until__gt=now)
+        .order_by('id')
+        .values('id')[:batch_size]
+    )
+    OutboxEvent.objects.filter(
+        pk__in=due,
+        processed_at__isnull=True
+    ).exclude(
+        locked_until__gt=now
+    ).update(locked_until=now + timedelta(seconds=LEASE_SECONDS), claim_token=token)
+    return token, OutboxEvent.objects.filter(claim_token=token).order_by('id')
+
+
+def _renew(token):
+    """
+    Extends the lease on this run's unfinished events.
+    Returns the ids still held, so events another worker re-claimed are skipped.
+    """
+    held = OutboxEvent.objects.filter(claim_token=token, processed_at__isnull=True)
+    held.update(locked_until=timezone.now() + timedelta(seconds=LEASE_SECONDS))
+    return set(held.values_list('id', flat=True))
+
+
+def _merge_invalidations(events):
+    """One payload covering every cache.invalidate event of a batch, without repeats."""
+    keys, patterns = {}, {}
+    for event in events:
+        keys.update(dict.fromkeys(event.payload.get('keys', [])))
+        patterns.update(dict.fromkeys(event.payload.get('patterns', [])))
+    return {'keys': list(keys), 'patterns': list(patterns)}
+
+
+def _run(events, payload):
+    """
+    Runs one handler call for events and records the outcome right away,
+    so a crash later in the batch does not replay finished work.
+    """
+    try:
+        func = HANDLERS[events[0].topic]
+        func(payload)
+    except Exception as exc:
+        for event in events:
+            attempts = event.attempts + 1
+            logger.error(f"Outbox event {event.id} ({event.topic}) failed, attempt {attempts}: {exc}")
+            OutboxEvent.objects.filter(pk=event.pk).update(
+                attempts=F('attempts') + 1,
+                last_error=str(exc),
+                locked_until=None,
+                available_at=timezone.now() + timedelta(seconds=2 ** attempts)
+            )
+        return 0
+    OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(processed_at=timezone.now(), locked_until=None)
+    return len(events)
+
+
+def process_batch(batch_size=BATCH_SIZE):
+    """
+    Runs up to batch_size due events. Cache invalidations in the batch are
+    merged into one call. Failures are retried with exponential backoff
+    until MAX_ATTEMPTS is reached.
+    Returns the number of events processed successfully.
+    """
+    token, events = _claim(batch_size)
+    events = list(events)
+    invalidations = [event for event in events if event.topic == CACHE_INVALIDATE]
+    units = [(invalidations, _merge_invalidations(invalidations))] if invalidations else []
+    units += [([event], event.payload) for event in events if event.topic != CACHE_INVALIDATE]
+
+    succeeded = 0
+    renewed_at = time.monotonic()
+    held = {event.pk for event in events}
+    for unit_events, payload in units:
+        if time.monotonic() - renewed_at > LEASE_SECONDS / 2:
+            held = _renew(token)
+            renewed_at = time.monotonic()
+        unit_events = [event for event in unit_events if event.pk in held]
+        if unit_events:
+            succeeded += _run(unit_events, payload)
+    return succeeded
+
+
+def outbox_metrics():
+    pending = pending_events()
+    oldest = pending.aggregate(oldest=Min('created_at'))['oldest']
+    return {
+        'queue_depth': pending.count(),
+        'lag_seconds': (timezone.now() - oldest).total_seconds() if oldest else 0.0,
+        'failed': OutboxEvent.objects.filter(processed_at__isnull=True, attempts__gte=MAX_ATTEMPTS).count(),
+    }
+
+
+def purge_processed(older_than=timedelta(days=7)):
+    cutoff = timezone.now() - older_than
+    deleted, _ = OutboxEvent.objects.filter(processed_at__lt=cutoff).delete()
+    return deleted
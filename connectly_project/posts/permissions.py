@@ -1,4 +1,5 @@
 from rest_framework.permissions import BasePermission
+from .permission_cache import has_perm
 
 class IsPostAuthor(BasePermission):
     def has_object_permission(self, request, view, obj):
@@ -28,4 +29,4 @@ class IsOwnerOrFriend(BasePermission):
 
 class CanViewPrivatePost(BasePermission):
     def has_permission(self, request, view):
-        return request.user.has_perm('posts.view_private_post')  # For admins/moderators
\ No newline at end of file
+        return has_perm(request.user, 'posts.view_private_post')  # For admins/moderators
\ No newline at end of file
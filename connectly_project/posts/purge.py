@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.db import transaction
+from .models import Post, Comment, Like
+from .outbox import handler, enqueue
+from .like_buffer import forget_post
+from singletons.logger_singleton import LoggerSingleton
+
+logger = LoggerSingleton().get_logger()
+
+PURGE_CHUNK_SIZE = getattr(settings, 'POST_PURGE_CHUNK_SIZE', 1000)
+POST_PURGE = 'post.purge'
+
+
+def _delete_chunk(model, post_id, chunk_size):
+    ids = list(model.objects.filter(post_id=post_id).values_list('id', flat=True)[:chunk_size])
+    if ids:
+        # Nothing references likes or comments, so this is a single DELETE
+        # per chunk instead of the CASCADE collector loading every row.
+        model.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+def _delete_in_chunks(model, post_id, chunk_size):
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            count = _delete_chunk(model, post_id, chunk_size)
+        if not count:
+            return deleted
+        deleted += count
+        logger.info(f"Purged {deleted} {model._meta.verbose_name_plural} of post {post_id}.")
+
+
+def purge_step(post_id, chunk_size=PURGE_CHUNK_SIZE):
+    """
+    Deletes one chunk of a soft-deleted post's likes, then comments, then
+    the post row. Returns True while there is more left to delete.
+    """
+    if not Post.all_objects.filter(pk=post_id, deleted_at__isnull=False).exists():
+        return False
+    for model in (Like, Comment):
+        if _delete_chunk(model, post_id, chunk_size):
+            return True
+    Post.all_objects.filter(pk=post_id).delete()
+    forget_post(post_id)
+    logger.info(f"Purged post {post_id}.")
+    return False
+
+
+def purge_post(post_id, chunk_size=PURGE_CHUNK_SIZE):
+    """
+    Removes a soft-deleted post's likes and comments in bounded chunks,
+    then the post itself. Progress lives in the database, so an interrupted
+    purge resumes where it stopped when run again.
+    """
+    if not Post.all_objects.filter(pk=post_id, deleted_at__isnull=False).exists():
+        return False
+    _delete_in_chunks(Like, post_id, chunk_size)
+    _delete_in_chunks(Comment, post_id, chunk_size)
+    Post.all_objects.filter(pk=post_id).delete()
+    forget_post(post_id)
+    logger.info(f"Purged post {post_id}.")
+    return True
+
+
+@handler(POST_PURGE)
+def purge_post_event(payload):
+    # One chunk per event keeps each outbox event short, so cache
+    # invalidations queued behind a big purge are not held up and the
+    # event always finishes well inside its lease.
+    with transaction.atomic():
+        if purge_step(payload['post_id']):
+            enqueue(POST_PURGE, payload)
+
+
+def purge_status():
+    """Soft-deleted posts still waiting for their rows to be purged."""
+    pending = Post.all_objects.filter(deleted_at__isnull=False).order_by('deleted_at').values('id', 'deleted_at')
+    return [
+        {
+            **row,
+            'remaining_likes': Like.objects.filter(post_id=row['id']).count(),
+            'remaining_comments': Comment.objects.filter(post_id=row['id']).count(),
+        }
+        for row in pending
+    ]
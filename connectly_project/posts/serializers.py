@@ -1,6 +1,9 @@
 from rest_framework import serializers
-from django.contrib.auth.models import User, Group
-from .models import Post, Comment, Like
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from .models import Post, Comment, Like, ArchivedPost
+
+User = get_user_model()
 
 class UserSerializer(serializers.ModelSerializer):
     groups = serializers.SlugRelatedField(
@@ -42,7 +45,13 @@ class PostSerializer(serializers.ModelSerializer):
             return super().create(validated_data)
 
     def get_likes_count(self, obj):
-        return obj.likes.count()
+        # Persisted likes only; buffered likes are overlaid at read time
+        # by posts.like_buffer.with_live_like_counts.
+        # Querysets annotated with likes_total avoid a COUNT per post.
+        count = getattr(obj, 'likes_total', None)
+        if count is None:
+            count = obj.likes.count()
+        return count
 
 class CommentSerializer(serializers.ModelSerializer):
     author_name = serializers.CharField(source='author.username', read_only=True)
@@ -63,3 +72,10 @@ class LikeSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'post', 'created_at']
         read_only_fields = ['user', 'created_at']
 
+class ArchivedPostSerializer(serializers.ModelSerializer):
+    author_name = serializers.CharField(source='author.username', read_only=True)
+
+    class Meta:
+        model = ArchivedPost
+        fields = ['id', 'title', 'content', 'author', 'author_name', 'likes_count', 'comments_count', 'created_at', 'privacy', 'archived_at']
+        read_only_fields = fields
@@ -0,0 +1,58 @@
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from . import permission_cache
+
+User = get_user_model()
+
+CHANGE_ACTIONS = ('post_add', 'post_remove', 'post_clear')
+
+
+# Bump versions only after commit; bumping earlier lets a concurrent request
+# cache a snapshot of the pre-commit rows under the new version.
+def invalidate_user(user_id):
+    transaction.on_commit(lambda: permission_cache.invalidate_user(user_id))
+
+
+def invalidate_all():
+    transaction.on_commit(permission_cache.invalidate_all)
+
+
+def user_relations_changed(sender, instance, action, reverse, **kwargs):
+    if action not in CHANGE_ACTIONS:
+        return
+    if not reverse:
+        invalidate_user(instance.pk)
+    else:
+        # Changed from the group/permission side; pk_set may be None on clear.
+        invalidate_all()
+
+
+def group_permissions_changed(sender, action, **kwargs):
+    if action in CHANGE_ACTIONS:
+        invalidate_all()
+
+
+def group_deleted(sender, **kwargs):
+    invalidate_all()
+
+
+def object_permission_changed(sender, instance, **kwargs):
+    if getattr(instance, 'user_id', None):
+        invalidate_user(instance.user_id)
+    else:
+        invalidate_all()
+
+
+def connect_signals():
+    m2m_changed.connect(user_relations_changed, sender=User.groups.through)
+    m2m_changed.connect(user_relations_changed, sender=User.user_permissions.through)
+    m2m_changed.connect(group_permissions_changed, sender=Group.permissions.through)
+    post_delete.connect(group_deleted, sender=Group)
+    if apps.is_installed('guardian'):
+        from guardian.models import UserObjectPermission, GroupObjectPermission
+        for model in (UserObjectPermission, GroupObjectPermission):
+            post_save.connect(object_permission_changed, sender=model)
+            post_delete.connect(object_permission_changed, sender=model)
@@ -1,3 +1,647 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import threading
+import zlib
+from unittest import mock
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.contrib.auth.models import Group, Permission
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django_redis import get_redis_connection
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from .models import Post, Comment, Like, OutboxEvent, ArchivedPost
+from . import like_buffer, outbox, purge, permission_cache, events, archive, hashing
+from . import asgi as stream_asgi
+from . import fragments
+from .fragments import paginated_post_ids, post_fragments
+from .views import CustomPagination
+from singletons.config_manager import ConfigManager, ConfigSnapshot
 
-# Create your tests here.
+User = get_user_model()
+
+TEST_CACHES = {
+    "default": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": "redis://127.0.0.1:6379/15",
+        "OPTIONS": {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+        }
+    }
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class RedisTestCase(TestCase):
+    """Runs against a scratch Redis database that is emptied around each test."""
+
+    config_overrides = {}
+
+    def setUp(self):
+        get_redis_connection('default').flushdb()
+        manager = ConfigManager()
+        self._snapshot = manager.snapshot
+        manager.snapshot = ConfigSnapshot(0, {**self._snapshot.as_dict(), **self.config_overrides})
+        self.author = User.objects.create(username='author')
+        self.post = Post.objects.create(title='Viral', content='...', author=self.author)
+
+    def tearDown(self):
+        ConfigManager().snapshot = self._snapshot
+        get_redis_connection('default').flushdb()
+
+
+class LikeBufferTests(RedisTestCase):
+    config_overrides = {'LIKE_WRITE_BEHIND': True}
+
+    def test_duplicate_buffered_like_is_rejected(self):
+        fan = User.objects.create(username='fan')
+        self.assertTrue(like_buffer.buffer_like(fan.id, self.post.id))
+        self.assertFalse(like_buffer.buffer_like(fan.id, self.post.id))
+
+    def test_like_already_persisted_is_rejected(self):
+        fan = User.objects.create(username='fan')
+        Like.objects.create(user=fan, post=self.post)
+        self.assertFalse(like_buffer.buffer_like(fan.id, self.post.id))
+
+    def test_dedupe_after_seeding_needs_no_queries(self):
+        first, second = User.objects.create(username='a'), User.objects.create(username='b')
+        like_buffer.buffer_like(first.id, self.post.id)
+        with self.assertNumQueries(0):
+            like_buffer.buffer_like(second.id, self.post.id)
+
+    def test_flush_persists_buffered_likes_in_batches(self):
+        fans = [User.objects.create(username=f'fan{i}') for i in range(5)]
+        for fan in fans:
+            like_buffer.buffer_like(fan.id, self.post.id)
+        self.assertEqual(like_buffer.flush_likes(batch_size=2), 5)
+        self.assertEqual(Like.objects.filter(post=self.post).count(), 5)
+        self.assertEqual(like_buffer.flush_likes(), 0)
+
+    def test_count_is_stable_across_flush(self):
+        persisted = User.objects.create(username='old')
+        Like.objects.create(user=persisted, post=self.post)
+        for i in range(3):
+            like_buffer.buffer_like(User.objects.create(username=f'fan{i}').id, self.post.id)
+        self.assertEqual(like_buffer.live_like_counts([self.post.id]), {self.post.id: 4})
+        like_buffer.flush_likes()
+        self.assertEqual(like_buffer.live_like_counts([self.post.id]), {self.post.id: 4})
+
+    def test_interrupted_flush_is_resumed_without_double_counting(self):
+        fans = [User.objects.create(username=f'fan{i}') for i in range(3)]
+        for fan in fans:
+            like_buffer.buffer_like(fan.id, self.post.id)
+        conn = get_redis_connection('default')
+        buffer_key, inflight_key, _, _ = like_buffer._keys(self.post.id)
+        # Simulate a worker that moved a batch and wrote it, then died.
+        moved = conn.register_script(like_buffer.MOVE_SCRIPT)(keys=[buffer_key, inflight_key], args=[2])
+        Like.objects.bulk_create([Like(post=self.post, user_id=int(u)) for u in moved])
+
+        like_buffer.flush_likes()
+        self.assertEqual(Like.objects.filter(post=self.post).count(), 3)
+        self.assertEqual(like_buffer.live_like_counts([self.post.id]), {self.post.id: 3})
+
+    def test_flush_corrects_a_drifted_mirror(self):
+        fan, other = User.objects.create(username='fan'), User.objects.create(username='other')
+        Like.objects.create(user=fan, post=self.post)
+        like_buffer.buffer_like(other.id, self.post.id)
+        # The mirror lost a persisted liker, so their second like is buffered.
+        get_redis_connection('default').srem(like_buffer._keys(self.post.id)[2], fan.id)
+        self.assertTrue(like_buffer.buffer_like(fan.id, self.post.id))
+        like_buffer.flush_likes()
+        self.assertEqual(Like.objects.filter(post=self.post).count(), 2)
+        self.assertEqual(like_buffer.live_like_counts([self.post.id]), {self.post.id: 2})
+
+    def test_evicted_likers_set_is_reseeded(self):
+        fans = [User.objects.create(username=f'fan{i}') for i in range(3)]
+        Like.objects.create(user=fans[0], post=self.post)
+        like_buffer.buffer_like(fans[1].id, self.post.id)
+        conn = get_redis_connection('default')
+        conn.delete(like_buffer._keys(self.post.id)[2])
+        self.assertFalse(like_buffer.buffer_like(fans[0].id, self.post.id))
+        self.assertFalse(like_buffer.buffer_like(fans[1].id, self.post.id))
+        self.assertTrue(like_buffer.buffer_like(fans[2].id, self.post.id))
+        self.assertEqual(like_buffer.live_like_counts([self.post.id]), {self.post.id: 3})
+
+    def test_seed_in_chunks_and_mirror_expires(self):
+        fans = [User.objects.create(username=f'fan{i}') for i in range(5)]
+        Like.objects.bulk_create([Like(user=fan, post=self.post) for fan in fans[:4]])
+        with mock.patch.object(like_buffer, 'SEED_CHUNK_SIZE', 3):
+            like_buffer.buffer_like(fans[4].id, self.post.id)
+        conn = get_redis_connection('default')
+        buffer_key, _, users_key, count_key = like_buffer._keys(self.post.id)
+        self.assertEqual(conn.scard(users_key), 5)
+        self.assertEqual(like_buffer.live_like_counts([self.post.id]), {self.post.id: 5})
+        self.assertGreater(conn.ttl(users_key), 0)
+        self.assertGreater(conn.ttl(count_key), 0)
+        self.assertEqual(conn.ttl(buffer_key), -1)
+
+    def test_fragment_shows_buffered_likes_without_invalidation(self):
+        cache.set(f'post_{self.post.id}', {'id': self.post.id, 'likes_count': 0})
+        like_buffer.buffer_like(User.objects.create(username='fan').id, self.post.id)
+        cached = cache.get(f'post_{self.post.id}')
+        self.assertIsNotNone(cached)
+        self.assertEqual(like_buffer.with_live_like_counts([cached])[0]['likes_count'], 1)
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        outbox.HANDLERS['test.record'] = self.calls.append
+        outbox.HANDLERS['test.fail'] = self._fail
+
+    def tearDown(self):
+        outbox.HANDLERS.pop('test.record')
+        outbox.HANDLERS.pop('test.fail')
+
+    def _fail(self, payload):
+        raise RuntimeError('boom')
+
+    def test_batch_is_claimed_with_one_statement(self):
+        for i in range(5):
+            outbox.enqueue('test.record', {'n': i})
+        with self.assertNumQueries(1):
+            outbox._claim(batch_size=3)
+        self.assertEqual(OutboxEvent.objects.exclude(claim_token='').count(), 3)
+
+    def test_processed_events_run_once(self):
+        for i in range(3):
+            outbox.enqueue('test.record', {'n': i})
+        self.assertEqual(outbox.process_batch(), 3)
+        self.assertEqual(outbox.process_batch(), 0)
+        self.assertEqual(self.calls, [{'n': 0}, {'n': 1}, {'n': 2}])
+
+    def test_leased_event_is_skipped_until_lease_expires(self):
+        event = outbox.enqueue('test.record', {})
+        OutboxEvent.objects.filter(pk=event.pk).update(locked_until=timezone.now() + timedelta(seconds=60))
+        self.assertEqual(outbox.process_batch(), 0)
+        OutboxEvent.objects.filter(pk=event.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(outbox.process_batch(), 1)
+
+    def test_failure_is_retried_with_backoff(self):
+        event = outbox.enqueue('test.fail', {})
+        self.assertEqual(outbox.process_batch(), 0)
+        event.refresh_from_db()
+        self.assertEqual(event.attempts, 1)
+        self.assertEqual(event.last_error, 'boom')
+        self.assertGreater(event.available_at, timezone.now())
+        self.assertIsNone(event.locked_until)
+        # Not due yet.
+        self.assertEqual(outbox.process_batch(), 0)
+        self.assertEqual(OutboxEvent.objects.get(pk=event.pk).attempts, 1)
+
+    def test_event_is_dead_after_max_attempts(self):
+        event = outbox.enqueue('test.fail', {})
+        for _ in range(outbox.MAX_ATTEMPTS):
+            OutboxEvent.objects.filter(pk=event.pk).update(available_at=timezone.now())
+            outbox.process_batch()
+        OutboxEvent.objects.filter(pk=event.pk).update(available_at=timezone.now())
+        self.assertEqual(outbox.process_batch(), 0)
+        self.assertEqual(OutboxEvent.objects.get(pk=event.pk).attempts, outbox.MAX_ATTEMPTS)
+        metrics = outbox.outbox_metrics()
+        self.assertEqual(metrics['queue_depth'], 0)
+        self.assertEqual(metrics['failed'], 1)
+
+    def test_finished_events_survive_a_crash_mid_batch(self):
+        def crash(payload):
+            raise KeyboardInterrupt
+        outbox.HANDLERS['test.crash'] = crash
+        self.addCleanup(outbox.HANDLERS.pop, 'test.crash')
+        outbox.enqueue('test.record', {'n': 0})
+        outbox.enqueue('test.crash', {})
+        with self.assertRaises(KeyboardInterrupt):
+            outbox.process_batch()
+        self.assertEqual(list(outbox.pending_events().values_list('topic', flat=True)), ['test.crash'])
+
+    def test_event_reclaimed_by_another_worker_is_skipped(self):
+        first = outbox.enqueue('test.record', {'n': 0})
+        second = outbox.enqueue('test.record', {'n': 1})
+
+        def record_and_lose_lease(payload):
+            self.calls.append(payload)
+            OutboxEvent.objects.filter(pk=second.pk).update(claim_token='other-worker')
+        outbox.HANDLERS['test.record'] = record_and_lose_lease
+        with mock.patch.object(outbox, 'LEASE_SECONDS', 0):
+            self.assertEqual(outbox.process_batch(), 1)
+        self.assertEqual(self.calls, [{'n': 0}])
+        self.assertIsNotNone(OutboxEvent.objects.get(pk=first.pk).processed_at)
+
+    def test_cache_invalidations_are_merged_per_batch(self):
+        for pk in (1, 2, 1):
+            outbox.enqueue_cache_invalidation(keys=[f'post_{pk}'], patterns=['posts_*', 'newsfeed_*'])
+        with mock.patch.object(outbox.cache, 'delete_pattern') as delete_pattern, \
+                mock.patch.object(outbox.cache, 'delete_many') as delete_many:
+            self.assertEqual(outbox.process_batch(), 3)
+        delete_many.assert_called_once_with(['post_1', 'post_2'])
+        self.assertEqual([c.args[0] for c in delete_pattern.call_args_list], ['posts_*', 'newsfeed_*'])
+
+    def test_metrics_report_depth_and_lag(self):
+        event = outbox.enqueue('test.record', {})
+        OutboxEvent.objects.filter(pk=event.pk).update(created_at=timezone.now() - timedelta(seconds=30))
+        metrics = outbox.outbox_metrics()
+        self.assertEqual(metrics['queue_depth'], 1)
+        self.assertGreaterEqual(metrics['lag_seconds'], 30)
+
+
+class PasswordHashingTests(TestCase):
+    def setUp(self):
+        # A small memory cost keeps the tests fast; must_update compares it too.
+        patcher = mock.patch.object(hashing.TunableArgon2PasswordHasher, 'memory_cost', 1024)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_login_rehashes_after_cost_change(self):
+        with mock.patch.object(hashing, 'HASH_WORKERS', 0):
+            user = User.objects.create_user(username='alice', password='s3cret-pass')
+            old_hash = user.password
+            with mock.patch.object(hashing.TunableArgon2PasswordHasher, 'time_cost', 1):
+                self.assertTrue(User.objects.get(pk=user.pk).check_password('s3cret-pass'))
+                new_hash = User.objects.get(pk=user.pk).password
+                self.assertNotEqual(new_hash, old_hash)
+                self.assertIn('t=1', new_hash)
+                self.assertTrue(User.objects.get(pk=user.pk).check_password('s3cret-pass'))
+                self.assertEqual(User.objects.get(pk=user.pk).password, new_hash)
+
+    def test_exhausted_admission_returns_503(self):
+        with mock.patch.object(hashing, 'HASH_WORKERS', 0):
+            User.objects.create_user(username='alice', password='s3cret-pass')
+        with mock.patch.object(hashing, '_slots', threading.BoundedSemaphore(1)) as slots, \
+                mock.patch.object(hashing, 'HASH_ADMISSION_TIMEOUT', 0.01):
+            slots.acquire()
+            api = self.client.post('/api/auth/login/', {'username': 'alice', 'password': 's3cret-pass'}, secure=True)
+            admin = self.client.post('/admin/login/', {'username': 'alice', 'password': 's3cret-pass'}, secure=True)
+        self.assertEqual(api.status_code, 503)
+        self.assertEqual(admin.status_code, 503)
+        self.assertEqual(admin['Retry-After'], '1')
+
+    def test_pool_is_rebuilt_after_workers_die(self):
+        self.addCleanup(hashing.reset_pool)
+        hashing._run(os.getpid)
+        pool = hashing._pool
+        for process in list(pool._processes.values()):
+            process.kill()
+        self.assertIsInstance(hashing._run(os.getpid), int)
+        self.assertIsNot(hashing._pool, pool)
+
+
+class PurgeTests(RedisTestCase):
+    def setUp(self):
+        super().setUp()
+        fans = [User.objects.create(username=f'fan{i}') for i in range(5)]
+        Like.objects.bulk_create([Like(post=self.post, user=fan) for fan in fans])
+        Comment.objects.bulk_create([Comment(post=self.post, author=fan, text='hi') for fan in fans[:3]])
+        Post.objects.filter(pk=self.post.pk).update(deleted_at=timezone.now())
+
+    def test_soft_deleted_post_is_hidden(self):
+        self.assertFalse(Post.objects.filter(pk=self.post.pk).exists())
+        self.assertTrue(Post.all_objects.filter(pk=self.post.pk).exists())
+
+    def test_each_step_deletes_one_bounded_chunk(self):
+        self.assertTrue(purge.purge_step(self.post.id, chunk_size=2))
+        self.assertEqual(Like.objects.filter(post_id=self.post.id).count(), 3)
+        self.assertEqual(Comment.objects.filter(post_id=self.post.id).count(), 3)
+
+    def test_interrupted_purge_resumes(self):
+        purge.purge_step(self.post.id, chunk_size=2)
+        status = purge.purge_status()
+        self.assertEqual(status[0]['remaining_likes'], 3)
+        self.assertTrue(purge.purge_post(self.post.id, chunk_size=2))
+        self.assertFalse(Post.all_objects.filter(pk=self.post.pk).exists())
+        self.assertFalse(Like.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(purge.purge_status(), [])
+
+    def test_outbox_event_reenqueues_itself_until_done(self):
+        outbox.enqueue(purge.POST_PURGE, {'post_id': self.post.id})
+        for _ in range(10):
+            if not outbox.process_batch():
+                break
+        self.assertFalse(Post.all_objects.filter(pk=self.post.pk).exists())
+        # Likes chunk, comments chunk, then the post row: one event each.
+        self.assertEqual(OutboxEvent.objects.filter(topic=purge.POST_PURGE).count(), 3)
+        self.assertEqual(outbox.pending_events().count(), 0)
+
+
+class PermissionCacheTests(RedisTestCase):
+    def setUp(self):
+        super().setUp()
+        self.viewer = User.objects.create(username='viewer')
+        self.group = Group.objects.create(name='moderators')
+        self.group.permissions.add(Permission.objects.get(codename='view_private_post'))
+
+    def fresh_user(self):
+        return User.objects.get(pk=self.viewer.pk)
+
+    def test_checks_are_memoized_per_request(self):
+        user = self.fresh_user()
+        permission_cache.has_perm(user, 'posts.view_private_post')
+        with self.assertNumQueries(0):
+            for _ in range(20):
+                permission_cache.has_perm(user, 'posts.view_private_post')
+
+    def test_group_change_invalidates_after_commit(self):
+        self.assertFalse(permission_cache.has_perm(self.fresh_user(), 'posts.view_private_post'))
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.viewer.groups.add(self.group)
+            # Not bumped until the transaction commits.
+            self.assertFalse(permission_cache.has_perm(self.fresh_user(), 'posts.view_private_post'))
+        self.assertTrue(callbacks)
+        self.assertTrue(permission_cache.has_perm(self.fresh_user(), 'posts.view_private_post'))
+
+    def test_group_permission_change_invalidates_members(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.viewer.groups.add(self.group)
+        self.assertTrue(permission_cache.has_perm(self.fresh_user(), 'posts.view_private_post'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.permissions.clear()
+        self.assertFalse(permission_cache.has_perm(self.fresh_user(), 'posts.view_private_post'))
+
+
+class ConfigManagerTests(RedisTestCase):
+
+    def test_unknown_key_is_rejected(self):
+        with self.assertRaises(ValueError):
+            ConfigManager().set_setting('DEFUALT_PAGE_SIZE', 5)
+        with self.assertRaises(ValueError):
+            ConfigManager().set_setting('version', 5)
+
+    def test_values_are_checked_against_default_type(self):
+        manager = ConfigManager()
+        for key, value in [('CACHE_TTL', 'abc'), ('DEFAULT_PAGE_SIZE', 2.5), ('DEFAULT_PAGE_SIZE', 0),
+                           ('DEFAULT_PAGE_SIZE', True), ('LIKE_WRITE_BEHIND', 1)]:
+            with self.assertRaises(ValueError):
+                manager.set_setting(key, value)
+        self.assertFalse(get_redis_connection('default').exists('config:values'))
+
+    def test_integer_values_are_bounded(self):
+        manager = ConfigManager()
+        for key, value in [('DEFAULT_PAGE_SIZE', 1000000), ('DEFAULT_PAGE_SIZE', CustomPagination.max_page_size + 1),
+                           ('CACHE_TTL', 10 ** 9)]:
+            with self.assertRaises(ValueError):
+                manager.set_setting(key, value)
+        manager.set_setting('DEFAULT_PAGE_SIZE', CustomPagination.max_page_size)
+        self.assertEqual(manager.snapshot.DEFAULT_PAGE_SIZE, CustomPagination.max_page_size)
+
+    def test_pagination_never_exceeds_max_page_size(self):
+        manager = ConfigManager()
+        manager.snapshot = ConfigSnapshot(0, {**manager.snapshot.as_dict(), 'DEFAULT_PAGE_SIZE': 10 ** 6})
+        self.assertEqual(CustomPagination().page_size, CustomPagination.max_page_size)
+
+    def test_valid_value_is_coerced_and_applied(self):
+        manager = ConfigManager()
+        manager.set_setting('DEFAULT_PAGE_SIZE', '5')
+        self.assertEqual(manager.snapshot.DEFAULT_PAGE_SIZE, 5)
+
+    def test_invalid_stored_override_keeps_default(self):
+        manager = ConfigManager()
+        conn = get_redis_connection('default')
+        conn.hset('config:values', 'CACHE_TTL', '"abc"')
+        conn.incr('config:version')
+        manager.refresh()
+        self.assertEqual(manager.snapshot.CACHE_TTL, manager.defaults['CACHE_TTL'])
+
+
+class PostPageCacheTests(RedisTestCase):
+
+    def test_partly_cached_page_costs_one_get_many_and_one_query(self):
+        posts = [self.post] + [Post.objects.create(title=f'Post {i}', content='...', author=self.author) for i in range(3)]
+        ids = [post.id for post in posts]
+        post_fragments(ids[:2], None)
+        with mock.patch.object(fragments.cache, 'get_many', wraps=fragments.cache.get_many) as get_many, \
+                self.assertNumQueries(1):
+            items = post_fragments(ids, None)
+        get_many.assert_called_once()
+        self.assertEqual([item['id'] for item in items], ids)
+        with self.assertNumQueries(0):
+            post_fragments(ids, None)
+
+    def test_like_invalidates_only_the_post_fragment(self):
+        fan = User.objects.create(username='fan', role='EDITOR')
+        client = APIClient()
+        client.force_authenticate(fan)
+        self.assertEqual(client.get('/posts/posts/', secure=True).status_code, 200)
+        id_keys = cache.keys('posts_ids_*')
+        self.assertTrue(id_keys)
+        self.assertIsNotNone(cache.get(f'post_{self.post.id}'))
+
+        self.assertEqual(client.post('/posts/likes/', {'post': self.post.id}, secure=True).status_code, 201)
+        outbox.process_batch()
+        self.assertIsNone(cache.get(f'post_{self.post.id}'))
+        self.assertEqual(cache.keys('posts_ids_*'), id_keys)
+        self.assertEqual(client.get('/posts/posts/', secure=True).data['results'][0]['likes_count'], 1)
+
+    def test_page_size_change_is_not_served_stale(self):
+        for i in range(4):
+            Post.objects.create(title=f'Post {i}', content='...', author=self.author)
+        ids = list(Post.objects.order_by('id').values_list('id', flat=True))
+        manager = ConfigManager()
+
+        def second_page(page_size):
+            manager.snapshot = ConfigSnapshot(0, {**manager.snapshot.as_dict(), 'DEFAULT_PAGE_SIZE': page_size})
+            request = Request(APIRequestFactory().get('/posts/', {'page': 2}))
+            return paginated_post_ids(Post.objects.order_by('id'), request, CustomPagination(), 'posts_ids_/posts/?page=2')['ids']
+
+        self.assertEqual(second_page(2), ids[2:4])
+        self.assertEqual(second_page(3), ids[3:6])
+
+
+class ArchiveTests(RedisTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.fans = [User.objects.create(username=f'fan{i}') for i in range(5)]
+        self.small = Post.objects.create(title='Quiet', content='...', author=self.author)
+        Like.objects.create(user=self.fans[0], post=self.small)
+        for fan in self.fans:
+            Like.objects.create(user=fan, post=self.post)
+        Comment.objects.create(text='First', author=self.fans[0], post=self.post)
+        Post.all_objects.update(created_at=timezone.now() - timedelta(days=400))
+
+    def test_batch_stops_at_row_cap(self):
+        Post.all_objects.filter(pk=self.small.pk).update(created_at=timezone.now() - timedelta(days=500))
+        other = Post.objects.create(title='Other', content='...', author=self.author)
+        Like.objects.create(user=self.fans[0], post=other)
+        Post.all_objects.filter(pk=other.pk).update(created_at=timezone.now() - timedelta(days=450))
+        self.assertEqual(archive.archive_batch(archive.archive_cutoff(), max_rows=3), 2)
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+
+    def test_large_post_is_archived_alone_in_chunks(self):
+        expected = {
+            'comments': list(Comment.objects.filter(post=self.post).order_by('id').values(*archive.COMMENT_FIELDS)),
+            'likes': list(Like.objects.filter(post=self.post).order_by('id').values(*archive.LIKE_FIELDS)),
+        }
+        self.assertEqual(archive.archive_batch(archive.archive_cutoff(), max_rows=3), 1)
+        archived = ArchivedPost.objects.get(pk=self.post.pk)
+        self.assertEqual((archived.likes_count, archived.comments_count), (5, 1))
+        self.assertEqual(
+            archived.unpack_engagement(),
+            json.loads(json.dumps(expected, default=str))
+        )
+        self.assertFalse(Post.all_objects.filter(pk=self.post.pk).exists())
+        self.assertFalse(Like.objects.filter(post_id=self.post.pk).exists())
+
+    def test_chunked_blob_matches_pack_engagement(self):
+        comments = list(Comment.objects.filter(post=self.post).order_by('id').values(*archive.COMMENT_FIELDS))
+        likes = list(Like.objects.filter(post=self.post).order_by('id').values(*archive.LIKE_FIELDS))
+        _, _, blob = archive._pack_engagement_in_chunks(self.post.pk, chunk_size=2)
+        self.assertEqual(zlib.decompress(blob), zlib.decompress(ArchivedPost.pack_engagement(comments, likes)))
+
+    def test_archive_old_posts_moves_everything(self):
+        self.assertEqual(archive.archive_old_posts(max_rows=3), 2)
+        self.assertFalse(Post.all_objects.exists())
+        self.assertEqual(ArchivedPost.objects.count(), 2)
+
+    def test_buffered_likes_are_flushed_before_archiving(self):
+        late = User.objects.create(username='late')
+        Post.all_objects.filter(pk=self.small.pk).update(created_at=timezone.now() - timedelta(days=500))
+        like_buffer.buffer_like(late.id, self.small.pk)
+        self.assertEqual(archive.archive_batch(archive.archive_cutoff(), max_rows=3), 1)
+        like_buffer.buffer_like(late.id, self.post.pk)
+        self.assertEqual(archive.archive_large_post(self.post.pk, chunk_size=2), 1)
+        for post, likes in [(self.small, 2), (self.post, 6)]:
+            archived = ArchivedPost.objects.get(pk=post.pk)
+            self.assertEqual(archived.likes_count, likes)
+            self.assertIn(late.id, [like['user_id'] for like in archived.unpack_engagement()['likes']])
+        self.assertFalse(like_buffer._redis().exists(like_buffer.DIRTY_KEY))
+
+    def test_owner_can_delete_archived_post(self):
+        archive.archive_old_posts()
+        client = APIClient()
+        client.force_authenticate(self.author)
+        url = reverse('post-detail', args=[self.small.pk])
+        self.assertEqual(client.get(url, secure=True).status_code, 200)
+        self.assertEqual(client.delete(url, secure=True).status_code, 204)
+        self.assertFalse(ArchivedPost.objects.filter(pk=self.small.pk).exists())
+        self.assertIsNone(cache.get(f'post_{self.small.pk}'))
+
+    def test_stranger_cannot_delete_archived_post(self):
+        archive.archive_old_posts()
+        client = APIClient()
+        client.force_authenticate(self.fans[1])
+        response = client.delete(reverse('post-detail', args=[self.small.pk]), secure=True)
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(ArchivedPost.objects.filter(pk=self.small.pk).exists())
+
+
+class EventStreamTests(RedisTestCase):
+    def test_unstarted_stream_does_not_subscribe(self):
+        async def scenario():
+            broker = events.EventBroker()
+            stream = events.event_stream(broker, 1, frozenset())
+            await stream.aclose()
+            return broker.connection_count
+        self.assertEqual(asyncio.run(scenario()), 0)
+
+    def test_closed_stream_unsubscribes(self):
+        async def scenario():
+            broker = events.EventBroker()
+            stream = events.event_stream(broker, 1, frozenset())
+            await stream.__anext__()
+            opened = broker.connection_count
+            await stream.aclose()
+            return opened, broker.connection_count
+        self.assertEqual(asyncio.run(scenario()), (1, 0))
+
+    def test_stream_refuses_wsgi(self):
+        client = APIClient()
+        client.force_authenticate(self.author)
+        response = client.get('/posts/newsfeed/stream/', secure=True)
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(response.streaming)
+
+    async def _open_stream(self, query=b'', headers=()):
+        """Drives posts.asgi.newsfeed_stream like an ASGI server; returns (status, first body, streams left open)."""
+        sent = []
+        answered = asyncio.Event()
+        disconnected = asyncio.Event()
+        requested = []
+
+        async def receive():
+            if not requested:
+                requested.append(True)
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+            if message['type'] == 'http.response.body':
+                answered.set()
+
+        scope = {'type': 'http', 'path': stream_asgi.NEWSFEED_STREAM_PATH, 'query_string': query, 'headers': list(headers)}
+        with mock.patch.object(stream_asgi.connections, 'close_all') as close_all:
+            task = asyncio.ensure_future(stream_asgi.newsfeed_stream(scope, receive, send))
+            await asyncio.wait_for(answered.wait(), timeout=5)
+            disconnected.set()
+            await asyncio.wait_for(task, timeout=5)
+        close_all.assert_called_once()
+        return sent[0]['status'], sent[1]['body'], events.get_broker().connection_count
+
+    async def test_stream_accepts_signed_ticket(self):
+        ticket = events.make_stream_ticket(self.author.id)
+        self.assertEqual(await self._open_stream(f'ticket={ticket}'.encode()), (200, b': connected\n\n', 0))
+
+    async def test_stream_accepts_token_header_only(self):
+        token = await Token.objects.acreate(user=self.author)
+        header = [(b'authorization', f'Token {token.key}'.encode())]
+        self.assertEqual((await self._open_stream(headers=header))[0], 200)
+        self.assertEqual((await self._open_stream(f'token={token.key}'.encode()))[0], 401)
+
+    async def test_stream_rejects_bad_tickets(self):
+        self.assertEqual((await self._open_stream(b'ticket=forged'))[0], 401)
+        with mock.patch.object(events, 'SSE_TICKET_MAX_AGE', -1):
+            expired = events.make_stream_ticket(self.author.id)
+            self.assertEqual((await self._open_stream(f'ticket={expired}'.encode()))[0], 401)
+
+    def test_stream_is_mounted_in_front_of_django(self):
+        self.assertEqual(reverse('newsfeed-stream'), stream_asgi.NEWSFEED_STREAM_PATH)
+        calls = []
+
+        async def django_application(scope, receive, send):
+            calls.append(scope['path'])
+
+        application = stream_asgi.with_stream_routes(django_application)
+        with mock.patch.object(stream_asgi, 'newsfeed_stream', mock.AsyncMock()) as stream:
+            asyncio.run(application({'type': 'http', 'path': '/posts/posts/'}, None, None))
+            asyncio.run(application({'type': 'http', 'path': stream_asgi.NEWSFEED_STREAM_PATH}, None, None))
+        self.assertEqual(calls, ['/posts/posts/'])
+        stream.assert_awaited_once()
+
+    def test_ticket_endpoint_requires_authentication(self):
+        client = APIClient()
+        self.assertEqual(client.post('/posts/newsfeed/stream/ticket/', secure=True).status_code, 401)
+        client.force_authenticate(self.author)
+        ticket = client.post('/posts/newsfeed/stream/ticket/', secure=True).data['ticket']
+        self.assertEqual(events.read_stream_ticket(ticket), self.author.id)
+
+    def test_redis_listener_reconnects(self):
+        event = {'type': 'post.created', 'author_id': 1, 'privacy': 'PUBLIC', 'post_id': 1}
+
+        async def deliver_one(broker, subscription):
+            for _ in range(50):
+                broker.publish(event)
+                try:
+                    return await asyncio.wait_for(subscription.queue.get(), timeout=0.1)
+                except asyncio.TimeoutError:
+                    continue
+
+        async def scenario():
+            broker = events.RedisEventBroker()
+            subscription = broker.subscribe(2, frozenset())
+            first = await deliver_one(broker, subscription)
+            # Only this broker's listener; other pub/sub clients share the server.
+            conn = get_redis_connection('default')
+            for client in conn.client_list(_type='pubsub'):
+                if client['name'] == broker.client_name:
+                    conn.client_kill_filter(_id=client['id'])
+            second = await deliver_one(broker, subscription)
+            broker._listener.cancel()
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        self.assertEqual(first, event)
+        self.assertEqual(second, event)
@@ -1,14 +1,17 @@
 from django.urls import path
-from .views import NewsfeedView
-from .views import UserListCreate, PostListCreate, CommentListCreate, PostDetailView, ProtectedView, AssignRoleView, LikeListCreate
+from .views import NewsfeedView, NewsfeedStreamTicketView, newsfeed_stream
+from .views import UserListCreate, PostListCreate, CommentListCreate, PostDetailView, ProtectedView, AssignRoleView, LikeListCreate, OutboxMetricsView
 
 urlpatterns = [
     path('users/', UserListCreate.as_view(), name='user-list-create'),
     path('posts/', PostListCreate.as_view(), name='post-list-create'),
     path('newsfeed/', NewsfeedView.as_view(), name='newsfeed'),  # New endpoint
+    path('newsfeed/stream/', newsfeed_stream, name='newsfeed-stream'),
+    path('newsfeed/stream/ticket/', NewsfeedStreamTicketView.as_view(), name='newsfeed-stream-ticket'),
     path('comments/', CommentListCreate.as_view(), name='comment-list-create'),
     path('posts/<int:pk>/', PostDetailView.as_view(), name='post-detail'),
     path('protected/', ProtectedView.as_view(), name='protected-view'),
     path('assign-role/', AssignRoleView.as_view(), name='assign-role'),
     path('likes/', LikeListCreate.as_view(), name='like-list-create'),
+    path('outbox/metrics/', OutboxMetricsView.as_view(), name='outbox-metrics'),
 ]
\ No newline at end of file
@@ -3,30 +3,41 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
-from django.contrib.auth.models import User, Group
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
 from django.contrib.auth import authenticate
-from .models import Post, Comment, Like
-from .serializers import UserSerializer, PostSerializer, CommentSerializer, LikeSerializer
+from .models import Post, Comment, Like, ArchivedPost
+from .serializers import UserSerializer, PostSerializer, CommentSerializer, LikeSerializer, ArchivedPostSerializer
 from .permissions import IsPostAuthor, IsAdmin, IsEditorOrAdmin, IsOwnerOrEditorOrAdmin
-from singletons.logger_singleton import LoggerSingleton
+from .like_buffer import write_behind_enabled, buffer_like, record_persisted_like, with_live_like_counts
+from .outbox import enqueue, enqueue_cache_invalidation, outbox_metrics
+from .purge import POST_PURGE
+from .fragments import post_page_response
+from .events import publish_event, make_stream_ticket, SSE_TICKET_MAX_AGE
+from singletons.config_manager import ConfigManager
 from factories.post_factory import PostFactory
 from rest_framework.authtoken.models import Token
 from rest_framework import generics
 from rest_framework.pagination import PageNumberPagination
 from django.core.cache import cache
-from django.shortcuts import get_object_or_404
-from django.core.cache.backends.base import DEFAULT_TIMEOUT
 from django.conf import settings
+from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.utils import timezone
+from django.http import JsonResponse
 
-logger = LoggerSingleton().get_logger()
-logger.info("API initialized successfully.")
+User = get_user_model()
 
-CACHE_TTL = getattr(settings, 'CACHE_TTL', DEFAULT_TIMEOUT)
+config = ConfigManager()
 
 class CustomPagination(PageNumberPagination):
-    page_size = 10
     page_size_query_param = 'page_size'
-    max_page_size = 100
+    max_page_size = getattr(settings, 'MAX_PAGE_SIZE', 100)
+
+    @property
+    def page_size(self):
+        # DRF only applies max_page_size to ?page_size=, so clamp this too.
+        return min(config.snapshot.DEFAULT_PAGE_SIZE, self.max_page_size)
 
 class UserListCreate(APIView):
     permission_classes = [IsAuthenticated, IsAdmin]
@@ -40,7 +51,7 @@ class UserListCreate(APIView):
             
         users = User.objects.all()
         serializer = UserSerializer(users, many=True)
-        cache.set(cache_key, serializer.data, timeout=CACHE_TTL)
+        cache.set(cache_key, serializer.data, timeout=config.snapshot.CACHE_TTL)
         return Response(serializer.data)
 
     def post(self, request):
@@ -63,26 +74,22 @@ class PostListCreate(APIView):
     pagination_class = CustomPagination
     
     def get(self, request):
-        cache_key = f'posts_{request.get_full_path()}'
-        cached_data = cache.get(cache_key)
-        
-        if cached_data:
-            return Response(cached_data)
-            
-        posts = Post.objects.all().order_by('-created_at')
-        page = self.pagination_class().paginate_queryset(posts, request)
-        serializer = PostSerializer(page, many=True, context={'request': request})
-        response = self.pagination_class().get_paginated_response(serializer.data)
-        cache.set(cache_key, response.data, timeout=CACHE_TTL)
-        return response
+        return post_page_response(
+            Post.objects.order_by('-created_at'),
+            request,
+            self.pagination_class(),
+            cache_key=f'posts_ids_{request.get_full_path()}'
+        )
 
     def post(self, request):
         serializer = PostSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            post = serializer.save(author=request.user)
-            cache.delete_pattern('posts_*')
-            cache.delete_pattern('newsfeed_*')
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            with transaction.atomic():
+                post = serializer.save(author=request.user)
+                enqueue_cache_invalidation(patterns=['posts_*', 'newsfeed_*'])
+                data = serializer.data
+                transaction.on_commit(lambda: publish_event('post.created', post, post_data=data))
+            return Response(data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class CommentListCreate(APIView):
@@ -95,17 +102,17 @@ class CommentListCreate(APIView):
         if cached_data:
             return Response(cached_data)
             
-        comments = Comment.objects.all()
+        comments = Comment.objects.filter(post__deleted_at__isnull=True)
         serializer = CommentSerializer(comments, many=True, context={'request': request})
-        cache.set(cache_key, serializer.data, timeout=CACHE_TTL)
+        cache.set(cache_key, serializer.data, timeout=config.snapshot.CACHE_TTL)
         return Response(serializer.data)
 
     def post(self, request):
         serializer = CommentSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            serializer.save(author=request.user)
-            cache.delete_pattern('comments_*')
-            cache.delete_pattern('posts_*')
+            with transaction.atomic():
+                serializer.save(author=request.user)
+                enqueue_cache_invalidation(patterns=['comments_*'])
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -117,20 +124,37 @@ class PostDetailView(APIView):
         cached_data = cache.get(cache_key)
         
         if cached_data:
-            return Response(cached_data)
+            return Response(with_live_like_counts([cached_data])[0])
             
-        post = get_object_or_404(Post, pk=pk)
-        self.check_object_permissions(request, post)
-        serializer = PostSerializer(post, context={'request': request})
-        cache.set(cache_key, serializer.data, timeout=CACHE_TTL)
-        return Response(serializer.data)
+        post = Post.objects.filter(pk=pk).first()
+        if post is None:
+            # Old posts live in the archive table once `archive_posts` has moved them.
+            post = get_object_or_404(ArchivedPost, pk=pk)
+            self.check_object_permissions(request, post)
+            serializer = ArchivedPostSerializer(post, context={'request': request})
+        else:
+            self.check_object_permissions(request, post)
+            serializer = PostSerializer(post, context={'request': request})
+        cache.set(cache_key, serializer.data, timeout=config.snapshot.CACHE_TTL)
+        return Response(with_live_like_counts([serializer.data])[0])
 
     def delete(self, request, pk):
-        post = get_object_or_404(Post, pk=pk)
+        post = Post.objects.filter(pk=pk).first()
+        if post is None:
+            # Archived posts have no hot rows left, so dropping the archive row is enough.
+            archived = get_object_or_404(ArchivedPost, pk=pk)
+            self.check_object_permissions(request, archived)
+            archived.delete()
+            cache.delete(f'post_{pk}')
+            return Response(status=status.HTTP_204_NO_CONTENT)
         self.check_object_permissions(request, post)
-        post.delete()
-        cache.delete_pattern('posts_*')
-        cache.delete_pattern('newsfeed_*')
+        with transaction.atomic():
+            post.deleted_at = timezone.now()
+            post.save(update_fields=['deleted_at'])
+            enqueue_cache_invalidation(patterns=['posts_*', 'newsfeed_*'])
+            enqueue(POST_PURGE, {'post_id': post.id})
+        # Hide the post from the detail endpoint right away.
+        cache.delete(f'post_{pk}')
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 class LikeListCreate(APIView):
@@ -143,32 +167,51 @@ class LikeListCreate(APIView):
         if cached_data:
             return Response(cached_data)
             
-        likes = Like.objects.all()
+        likes = Like.objects.filter(post__deleted_at__isnull=True)
         serializer = LikeSerializer(likes, many=True, context={'request': request})
-        cache.set(cache_key, serializer.data, timeout=CACHE_TTL)
+        cache.set(cache_key, serializer.data, timeout=config.snapshot.CACHE_TTL)
         return Response(serializer.data)
 
     def post(self, request):
         serializer = LikeSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            like, created = Like.objects.get_or_create(
-                user=request.user,
-                post=serializer.validated_data['post']
-            )
-            if not created:
-                return Response(
-                    {'message': 'You have already liked this post.'},
-                    status=status.HTTP_400_BAD_REQUEST
+            if write_behind_enabled():
+                return self._buffer_like(request, serializer.validated_data['post'])
+            with transaction.atomic():
+                like, created = Like.objects.get_or_create(
+                    user=request.user,
+                    post=serializer.validated_data['post']
                 )
-            cache.delete(f'post_{serializer.validated_data["post"].id}')
-            cache.delete_pattern('posts_*')
-            cache.delete('all_likes')
+                if not created:
+                    return Response(
+                        {'message': 'You have already liked this post.'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                enqueue_cache_invalidation(
+                    keys=[f'post_{serializer.validated_data["post"].id}', 'all_likes']
+                )
+                transaction.on_commit(lambda: record_persisted_like(like.user_id, like.post_id))
+                transaction.on_commit(lambda: publish_event('post.liked', like.post, delta=1))
             return Response(
                 LikeSerializer(like).data,
                 status=status.HTTP_201_CREATED
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def _buffer_like(self, request, post):
+        # Write-behind mode: the like is persisted later by `manage.py flush_likes`.
+        if not buffer_like(request.user.id, post.id):
+            return Response(
+                {'message': 'You have already liked this post.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # No invalidation: readers overlay the live count from Redis on the cached fragment.
+        publish_event('post.liked', post, delta=1)
+        return Response(
+            {'user': request.user.id, 'post': post.id},
+            status=status.HTTP_202_ACCEPTED
+        )
+
 class AssignRoleView(APIView):
     permission_classes = [IsAuthenticated, IsAdmin]
 
@@ -197,15 +240,30 @@ class NewsfeedView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        cache_key = 'newsfeed_posts'
-        cached_data = cache.get(cache_key)
-        
-        if cached_data:
-            return cached_data
-            
-        queryset = Post.objects.all().order_by('-created_at')
-        cache.set(cache_key, queryset, timeout=CACHE_TTL)
-        return queryset
+        return Post.objects.order_by('-created_at')
+
+    def list(self, request, *args, **kwargs):
+        return post_page_response(
+            self.get_queryset(),
+            request,
+            self.paginator,
+            cache_key=f'newsfeed_ids_{request.get_full_path()}'
+        )
+    
+class NewsfeedStreamTicketView(APIView):
+    """Issues the short-lived ?ticket= for newsfeed/stream/."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        return Response({'ticket': make_stream_ticket(request.user.id), 'expires_in': SSE_TICKET_MAX_AGE})
+
+def newsfeed_stream(request):
+    """
+    The event stream is served by posts.asgi, which asgi.py mounts in front of
+    Django. This view is only reached under WSGI (e.g. runserver), where a
+    stream would pin a worker thread per client.
+    """
+    return JsonResponse({'detail': 'The event stream is only served by the ASGI application.'}, status=503)
     
 class UserProfileView(APIView):
     permission_classes = [IsAuthenticated]
@@ -223,6 +281,13 @@ class UserProfileView(APIView):
         return Response(serializer.data)
     
 
+class OutboxMetricsView(APIView):
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request):
+        return Response(outbox_metrics())
+
+
 class ProtectedView(APIView):
     """
     A simple protected view that requires authentication
@@ -1,3 +1,31 @@
+import json
+import threading
+import time
+from django.conf import settings
+
+VALUES_KEY = "config:values"
+VERSION_KEY = "config:version"
+
+
+class ConfigSnapshot:
+    """Read-only settings; reads are plain attribute lookups."""
+
+    def __init__(self, version, values):
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "_values", dict(values))
+        for key, value in values.items():
+            object.__setattr__(self, key, value)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("ConfigSnapshot is read-only; use ConfigManager.set_setting")
+
+    def as_dict(self):
+        return dict(self._values)
+
+
+RESERVED_NAMES = frozenset(name for name in dir(ConfigSnapshot) if not name.startswith("__")) | {"version"}
+
+
 class ConfigManager:
     _instance = None
 
@@ -8,14 +36,108 @@ class ConfigManager:
         return cls._instance
 
     def _initialize(self):
-        self.settings = {
+        self.defaults = {
             "DEFAULT_PAGE_SIZE": 20,
             "ENABLE_ANALYTICS": True,
-            "RATE_LIMIT": 100
+            "RATE_LIMIT": 100,
+            **getattr(settings, "CONFIG_DEFAULTS", {}),
+        }
+        self.bounds = {
+            "RATE_LIMIT": (1, 100000),
+            **getattr(settings, "CONFIG_BOUNDS", {}),
         }
+        reserved = RESERVED_NAMES.intersection(self.defaults)
+        if reserved:
+            raise ValueError(f"Reserved config names: {', '.join(sorted(reserved))}")
+        # Swapped as a whole on refresh, never mutated.
+        self.snapshot = ConfigSnapshot(0, self.defaults)
+        self._poller = None
+
+    def validate(self, key, value):
+        """
+        Returns value coerced to the type of the key's default.
+        Raises ValueError for unknown keys and values that do not fit.
+        """
+        if key not in self.defaults:
+            raise ValueError(f"Unknown setting {key!r}; known: {', '.join(sorted(self.defaults))}")
+        default = self.defaults[key]
+        if isinstance(default, bool):
+            if isinstance(value, str) and value.lower() in ("true", "false"):
+                value = value.lower() == "true"
+            if not isinstance(value, bool):
+                raise ValueError(f"{key} must be true or false, got {value!r}")
+        elif isinstance(default, int):
+            try:
+                if isinstance(value, bool) or int(value) != float(value):
+                    raise ValueError
+                value = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{key} must be an integer, got {value!r}")
+            low, high = self.bounds.get(key, (1, None))
+            if value < low or (high is not None and value > high):
+                limit = f"between {low} and {high}" if high is not None else f"at least {low}"
+                raise ValueError(f"{key} must be {limit}, got {value}")
+        elif default is not None and not isinstance(value, type(default)):
+            raise ValueError(f"{key} must be of type {type(default).__name__}, got {value!r}")
+        return value
+
+    def _store(self):
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+
+    def refresh(self):
+        """Reloads the shared settings if their version changed."""
+        store = self._store()
+        version = int(store.get(VERSION_KEY) or 0)
+        if version == self.snapshot.version:
+            return False
+        overrides = {}
+        for raw_key, raw_value in store.hgetall(VALUES_KEY).items():
+            key = raw_key.decode()
+            try:
+                overrides[key] = self.validate(key, json.loads(raw_value))
+            except ValueError:
+                # Written by another release or by hand; keep the default.
+                continue
+        self.snapshot = ConfigSnapshot(version, {**self.defaults, **overrides})
+        return True
+
+    def _poll(self, interval):
+        from singletons.logger_singleton import LoggerSingleton
+        logger = LoggerSingleton().get_logger()
+        while True:
+            try:
+                if self.refresh():
+                    logger.info(f"Config reloaded at version {self.snapshot.version}.")
+            except Exception as exc:
+                logger.error(f"Config refresh failed: {exc}")
+            time.sleep(interval)
+
+    def start_polling(self, interval=None):
+        """Starts (or restarts, e.g. after a fork) the version poller thread."""
+        if self._poller is not None and self._poller.is_alive():
+            return
+        interval = interval or getattr(settings, "CONFIG_POLL_INTERVAL", 5)
+        self._poller = threading.Thread(target=self._poll, args=(interval,), name="config-poller", daemon=True)
+        self._poller.start()
 
     def get_setting(self, key):
-        return self.settings.get(key)
+        return getattr(self.snapshot, key, None)
 
     def set_setting(self, key, value):
-        self.settings[key] = value
\ No newline at end of file
+        """Writes to the shared store; other workers pick it up on their next poll."""
+        value = self.validate(key, value)
+        pipe = self._store().pipeline()
+        pipe.hset(VALUES_KEY, key, json.dumps(value))
+        pipe.incr(VERSION_KEY)
+        pipe.execute()
+        self.refresh()
+
+    def reset_setting(self, key):
+        if key not in self.defaults:
+            raise ValueError(f"Unknown setting {key!r}")
+        pipe = self._store().pipeline()
+        pipe.hdel(VALUES_KEY, key)
+        pipe.incr(VERSION_KEY)
+        pipe.execute()
+        self.refresh()